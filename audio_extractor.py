@@ -1,5 +1,10 @@
 import subprocess
 import os
+import numpy as np
+from metrics import span
+
+# Whisper works on 16 kHz mono audio
+SAMPLE_RATE = 16000
 
 def extract_audio(video_path, output_audio_path):
     """
@@ -22,7 +27,8 @@ def extract_audio(video_path, output_audio_path):
             output_audio_path
         ]
         print(f"Executing command: {' '.join(command)}")
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        with span("ffmpeg.extract_audio", format="mp3"):
+            result = subprocess.run(command, capture_output=True, text=True, check=True)
         print("Audio extraction successful!")
         print("STDOUT:", result.stdout)
         print("STDERR:", result.stderr)
@@ -36,6 +42,130 @@ def extract_audio(video_path, output_audio_path):
         print(f"An unexpected error occurred: {e}")
         return None
 
+def _pcm_command(video_path, output, sample_rate):
+    return [
+        "ffmpeg",
+        "-nostdin",
+        "-i", video_path,
+        "-vn", # No video
+        "-ac", "1", # Mono
+        "-ar", str(sample_rate), # Resample for Whisper
+        "-f", "s16le", # Raw signed 16-bit little-endian PCM
+        "-acodec", "pcm_s16le",
+        "-y",
+        output
+    ]
+
+def extract_audio_pcm(video_path, output_pcm_path, sample_rate=SAMPLE_RATE):
+    """
+    Decodes the audio of a video file once to raw 16 kHz mono PCM using ffmpeg.
+
+    The output is headerless signed 16-bit little-endian samples, which load_pcm
+    can memory-map and hand to Whisper without another ffmpeg decode.
+
+    Args:
+        video_path (str): The path to the input video file.
+        output_pcm_path (str): The path to save the raw PCM file (e.g., audio.pcm).
+        sample_rate (int): The output sample rate.
+
+    Returns:
+        str: The path to the PCM file if successful, None otherwise.
+    """
+    try:
+        command = _pcm_command(video_path, output_pcm_path, sample_rate)
+        print(f"Executing command: {' '.join(command)}")
+        with span("ffmpeg.extract_audio", format="pcm"):
+            subprocess.run(command, capture_output=True, text=True, check=True)
+        print("Audio extraction successful!")
+        return output_pcm_path
+    except subprocess.CalledProcessError as e:
+        print(f"Error extracting audio: {e}")
+        print("STDERR:", e.stderr)
+        return None
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+        return None
+
+def decode_audio(video_path, sample_rate=SAMPLE_RATE):
+    """
+    Decodes the audio of a video file to 16 kHz mono float32 samples over an ffmpeg pipe.
+
+    Args:
+        video_path (str): The path to the input video file.
+        sample_rate (int): The output sample rate.
+
+    Returns:
+        numpy.ndarray: The samples in [-1, 1], or None on failure.
+    """
+    try:
+        command = _pcm_command(video_path, "-", sample_rate)
+        result = subprocess.run(command, capture_output=True, check=True)
+        return np.frombuffer(result.stdout, np.int16).astype(np.float32) / 32768.0
+    except subprocess.CalledProcessError as e:
+        print(f"Error decoding audio: {e}")
+        print("STDERR:", e.stderr.decode("utf-8", errors="replace"))
+        return None
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+        return None
+
+def iter_audio_blocks(source, block_samples, sample_rate=SAMPLE_RATE):
+    """
+    Reads 16 kHz mono audio in blocks, without ever holding the whole file in memory.
+
+    A raw PCM file from extract_audio_pcm is read directly; any other media file is
+    decoded over an ffmpeg pipe.
+
+    Args:
+        source (str): The path to a .pcm file or a media file.
+        block_samples (int): Samples per block; the last block may be shorter.
+        sample_rate (int): The sample rate to decode media files to.
+
+    Yields:
+        numpy.ndarray: float32 samples in [-1, 1].
+    """
+    if source.endswith(".pcm"):
+        with open(source, "rb") as f:
+            while True:
+                # Plain reads rather than a memmap, whose touched pages would stay resident
+                block = np.fromfile(f, dtype=np.int16, count=block_samples)
+                if not len(block):
+                    return
+                yield block.astype(np.float32) / 32768.0
+
+    process = subprocess.Popen(_pcm_command(source, "-", sample_rate), stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL)
+    finished = False
+    try:
+        while True:
+            data = process.stdout.read(block_samples * 2)
+            if not data:
+                break
+            yield np.frombuffer(data[:len(data) // 2 * 2], np.int16).astype(np.float32) / 32768.0
+        finished = True
+    finally:
+        process.stdout.close()
+        if not finished:
+            process.kill()
+        process.wait()
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode {source} (exit code {process.returncode})")
+
+def pcm_duration(pcm_path, sample_rate=SAMPLE_RATE):
+    """
+    Returns the duration in seconds of a raw 16-bit mono PCM file.
+    """
+    return os.path.getsize(pcm_path) // 2 / sample_rate
+
+def load_pcm(pcm_path):
+    """
+    Memory-maps a raw PCM file written by extract_audio_pcm and returns float32 samples in [-1, 1].
+    """
+    if os.path.getsize(pcm_path) == 0:
+        return np.zeros(0, dtype=np.float32)
+    samples = np.memmap(pcm_path, dtype=np.int16, mode="r")
+    return samples.astype(np.float32) / 32768.0
+
 if __name__ == '__main__':
     # Example usage:
     # Create a dummy video file for testing
@@ -0,0 +1,1120 @@
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+class FakeTranslateClient:
+    """
+    Local stand-in for google.cloud.translate_v2.Client.
+
+    Each translate() call sleeps for a fixed round-trip latency plus a small
+    per-character cost, and returns the input text tagged with the target language.
+    """
+
+    def __init__(self, latency=0.05, per_char_latency=0.0, max_items=128):
+        self.latency = latency
+        self.per_char_latency = per_char_latency
+        self.max_items = max_items
+        self.requests = 0
+        self.characters = 0
+        self._lock = threading.Lock()
+
+    def translate(self, values, target_language=None, **kwargs):
+        single = isinstance(values, str)
+        if single:
+            values = [values]
+        if len(values) > self.max_items:
+            raise ValueError(f"Too many text segments: {len(values)} > {self.max_items}")
+
+        chars = sum(len(v) for v in values)
+        with self._lock:
+            self.requests += 1
+            self.characters += chars
+        time.sleep(self.latency + chars * self.per_char_latency)
+
+        results = [
+            {"translatedText": f"[{target_language}] {v}", "input": v}
+            for v in values
+        ]
+        return results[0] if single else results
+
+
+def write_synthetic_srt(path, num_cues, cue_ms=2000, gap_ms=500, text="This is synthetic subtitle line number {}."):
+    """
+    Writes an SRT file with num_cues generated cues.
+    """
+    def fmt(ms):
+        h, ms = divmod(ms, 3600000)
+        m, ms = divmod(ms, 60000)
+        s, ms = divmod(ms, 1000)
+        return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+    with open(path, "w", encoding="utf-8") as f:
+        start = 0
+        for i in range(num_cues):
+            end = start + cue_ms
+            f.write(f"{i + 1}\n{fmt(start)} --> {fmt(end)}\n{text.format(i + 1)}\n\n")
+            start = end + gap_ms
+    return path
+
+
+def synthetic_speech_audio(seconds, sample_rate=16000, seed=0):
+    """
+    Generates speech-like 16 kHz mono float32 audio: bursts of amplitude-modulated
+    harmonic tones with a varying pitch, separated by short pauses.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    parts = []
+    total = 0
+    while total < seconds * sample_rate:
+        burst = int(sample_rate * rng.uniform(1.5, 5.0))
+        t = np.arange(burst) / sample_rate
+        pitch = rng.uniform(100, 220) * (1 + 0.1 * np.sin(2 * np.pi * rng.uniform(0.5, 2) * t))
+        phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+        voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+        syllables = 0.5 * (1 + np.sin(2 * np.pi * rng.uniform(3, 6) * t))
+        parts.append((0.2 * voice * syllables).astype(np.float32))
+        pause = int(sample_rate * rng.uniform(0.3, 1.0))
+        parts.append(np.zeros(pause, dtype=np.float32))
+        total += burst + pause
+    return np.concatenate(parts)[:seconds * sample_rate]
+
+
+def write_synthetic_audio(path, seconds, sample_rate=16000):
+    """
+    Writes speech-like audio (see synthetic_speech_audio) as a 16-bit mono WAV file.
+    """
+    import wave
+    import numpy as np
+
+    samples = (synthetic_speech_audio(seconds, sample_rate) * 32767).astype(np.int16)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+    return path
+
+
+def make_test_video(path, seconds, size="320x240", rate=25):
+    """
+    Generates a short H.264/AAC MP4 test video with ffmpeg: the lavfi test pattern
+    with speech-like audio.
+    """
+    import subprocess
+
+    audio_path = write_synthetic_audio(f"{path}.wav", seconds)
+    try:
+        subprocess.run([
+            "ffmpeg", "-nostdin", "-y",
+            "-f", "lavfi", "-i", f"testsrc=size={size}:rate={rate}:duration={seconds}",
+            "-i", audio_path,
+            "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-shortest",
+            "-movflags", "+faststart",
+            path
+        ], capture_output=True, check=True)
+    finally:
+        os.remove(audio_path)
+    return path
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_translate(num_cues=1000, latency=0.05, max_workers=4):
+    """
+    Compares one-request-per-cue translation with batched, concurrent translation.
+    """
+    from subtitle_translator import translate_subtitle
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        srt_path = write_synthetic_srt(os.path.join(tmp, "input.srt"), num_cues)
+        modes = {
+            "per_cue": {"max_items": 1, "max_workers": 1},
+            "batched": {"max_workers": max_workers},
+        }
+        for mode, options in modes.items():
+            client = FakeTranslateClient(latency=latency)
+            output, elapsed = _timed(
+                translate_subtitle, srt_path, "zh-CN", os.path.join(tmp, f"{mode}.srt"),
+                translate_client=client, use_cache=False, **options
+            )
+            if not output:
+                raise RuntimeError(f"Translation failed in mode {mode}")
+            results[mode] = {"seconds": elapsed, "requests": client.requests}
+            print(f"translate[{mode}]: {num_cues} cues, {client.requests} requests, {elapsed:.2f}s")
+
+    print(f"translate speedup: {results['per_cue']['seconds'] / results['batched']['seconds']:.1f}x")
+    return results
+
+
+def bench_transcribe(seconds=300, model_name="tiny", workers=None, threads_per_worker=2):
+    """
+    Compares single-pass Whisper transcription with chunked, multi-process transcription.
+    """
+    from subtitle_generator import generate_subtitles
+
+    audio = synthetic_speech_audio(seconds)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        modes = {
+            "single": {"device": "cpu", "use_cache": False},
+            "chunked": {"device": "cpu", "use_cache": False, "chunked": True, "workers": workers,
+                        "threads_per_worker": threads_per_worker, "chunk_seconds": 60},
+        }
+        for mode, options in modes.items():
+            output_path = os.path.join(tmp, f"{mode}.srt")
+            # Load the model outside the timed run
+            generate_subtitles(audio[:16000], output_path, model_name, **options)
+            output, elapsed = _timed(generate_subtitles, audio, output_path, model_name, **options)
+            if not output:
+                raise RuntimeError(f"Transcription failed in mode {mode}")
+            results[mode] = {"seconds": elapsed, "realtime_factor": elapsed / seconds}
+            print(f"transcribe[{mode}]: {seconds}s of audio in {elapsed:.1f}s (RTF {elapsed / seconds:.3f})")
+
+    print(f"transcribe speedup: {results['single']['seconds'] / results['chunked']['seconds']:.1f}x")
+    return results
+
+
+_ENGINE_SCRIPT = """
+import json, resource, sys, time
+from subtitle_generator import generate_subtitles
+from transcription_engines import transcription_model
+
+audio_path, srt_path, engine, model_name, compute_type = sys.argv[1:6]
+compute_type = compute_type or None
+start = time.perf_counter()
+with transcription_model(engine, model_name, "cpu", compute_type):
+    pass
+load_seconds = time.perf_counter() - start
+start = time.perf_counter()
+output = generate_subtitles(audio_path, srt_path, model_name, "cpu", engine=engine, compute_type=compute_type,
+                            use_cache=False)
+print(json.dumps({
+    "ok": bool(output),
+    "load_seconds": load_seconds,
+    "seconds": time.perf_counter() - start,
+    "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+}))
+"""
+
+
+def bench_engines(seconds=120, model_name="tiny", engines=None):
+    """
+    Compares the transcription engines on the same synthetic audio, each in a fresh
+    interpreter: model load time, real-time factor and peak memory of the process.
+
+    Args:
+        engines (list): (engine, compute_type) pairs. Defaults to Whisper and faster-whisper int8.
+    """
+    import subprocess
+    import sys
+    from transcription_engines import get_engine
+
+    engines = engines or [("whisper", None), ("faster-whisper", "int8")]
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=repo_dir)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        audio_path = write_synthetic_pcm(os.path.join(tmp, "fixture.pcm"), seconds)
+        for engine, compute_type in engines:
+            name = f"{engine}[{compute_type or get_engine(engine).default_compute_type}]"
+            if not get_engine(engine).is_available():
+                print(f"engines[{name}]: not installed, skipping")
+                continue
+            srt_path = os.path.join(tmp, f"{engine}.srt")
+            output = subprocess.run([sys.executable, "-c", _ENGINE_SCRIPT, audio_path, srt_path, engine, model_name,
+                                     compute_type or ""], cwd=tmp, env=env, capture_output=True, text=True, check=True).stdout
+            sample = json.loads(output.strip().splitlines()[-1])
+            if not sample["ok"]:
+                raise RuntimeError(f"Transcription failed with engine {name}")
+            results[name] = {
+                "load_seconds": sample["load_seconds"],
+                "seconds": sample["seconds"],
+                "realtime_factor": sample["seconds"] / seconds,
+                "max_rss_bytes": sample["max_rss_bytes"],
+            }
+            print(f"engines[{name}]: {seconds}s of audio in {sample['seconds']:.1f}s (RTF {sample['seconds'] / seconds:.3f}), "
+                  f"model load {sample['load_seconds']:.1f}s, peak {sample['max_rss_bytes'] / 1024 / 1024:.0f} MB")
+    return results
+
+
+def write_synthetic_pcm(path, seconds, sample_rate=16000, block_seconds=60):
+    """
+    Writes speech-like audio as a raw 16-bit mono PCM file, one repeated block at a
+    time so that hours of audio can be written without holding them in memory.
+    """
+    import numpy as np
+
+    block = (synthetic_speech_audio(block_seconds, sample_rate) * 32767).astype(np.int16)
+    with open(path, "wb") as f:
+        for start in range(0, seconds, block_seconds):
+            f.write(block[:(min(block_seconds, seconds - start)) * sample_rate].tobytes())
+    return path
+
+
+class FakeWhisperModel:
+    """
+    Local stand-in for a Whisper model: returns one segment per 5 seconds of audio,
+    after sleeping for realtime_factor times the length of the audio.
+    """
+
+    def __init__(self, realtime_factor=0.0):
+        self.realtime_factor = realtime_factor
+
+    def transcribe(self, audio, initial_prompt=None, **kwargs):
+        seconds = len(audio) / 16000
+        time.sleep(seconds * self.realtime_factor)
+        segments = [{"start": start, "end": min(start + 5, seconds), "text": f" Segment at {start}s."}
+                    for start in range(0, int(seconds), 5)]
+        return {"segments": segments, "text": "".join(segment["text"] for segment in segments)}
+
+
+def register_fake_whisper_model(model_name="fake", realtime_factor=0.0):
+    """
+    Leaves a FakeWhisperModel idle in the model registry, so that the "whisper" engine
+    with model_name on device "cpu" uses it instead of loading a real model.
+    """
+    from model_registry import registry
+
+    with registry.lease(("whisper", model_name, "cpu"), lambda: FakeWhisperModel(realtime_factor)):
+        pass
+
+
+_MEMORY_SCRIPT = """
+import json, resource, sys
+from benchmark import register_fake_whisper_model
+import subtitle_generator
+
+register_fake_whisper_model()
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+output = subtitle_generator.generate_subtitles(sys.argv[1], sys.argv[2], "fake", "cpu", windowed=sys.argv[3] == "1",
+                                               use_cache=False)
+print(json.dumps({
+    "ok": bool(output),
+    "peak_growth_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 - before,
+}))
+"""
+
+
+def bench_memory(short_seconds=1800, long_seconds=10800, tolerance_mb=64):
+    """
+    Memory regression check for windowed transcription: transcribes a short and a long
+    PCM file with a stand-in model in fresh interpreters and compares the peak memory
+    growth of windowed and whole-file transcription.
+
+    Raises:
+        RuntimeError: If windowed transcription of the long file peaks more than
+            tolerance_mb above the short one, i.e. memory grows with audio length.
+    """
+    import subprocess
+    import sys
+
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=repo_dir)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for length, seconds in (("short", short_seconds), ("long", long_seconds)):
+            pcm_path = write_synthetic_pcm(os.path.join(tmp, f"{length}.pcm"), seconds)
+            for mode, windowed in (("windowed", "1"), ("full", "0")):
+                srt_path = os.path.join(tmp, f"{length}.{mode}.srt")
+                output = subprocess.run([sys.executable, "-c", _MEMORY_SCRIPT, pcm_path, srt_path, windowed],
+                                        cwd=tmp, env=env, capture_output=True, text=True, check=True).stdout
+                sample = json.loads(output.strip().splitlines()[-1])
+                if not sample["ok"]:
+                    raise RuntimeError(f"Transcription failed in mode {mode} on {seconds}s of audio")
+                results[f"{mode}_{length}"] = {"seconds": seconds, "peak_growth_bytes": sample["peak_growth_bytes"]}
+                print(f"memory[{mode}]: {seconds}s of audio, peak grew by "
+                      f"{sample['peak_growth_bytes'] / 1024 / 1024:.0f} MB")
+            os.remove(pcm_path)
+
+    growth = results["windowed_long"]["peak_growth_bytes"] - results["windowed_short"]["peak_growth_bytes"]
+    results["windowed_length_growth_bytes"] = growth
+    if growth > tolerance_mb * 1024 * 1024:
+        raise RuntimeError(f"Windowed transcription memory grows with audio length: {growth / 1024 / 1024:.0f} MB "
+                           f"more for {long_seconds}s than for {short_seconds}s, tolerance is {tolerance_mb} MB")
+    return results
+
+
+def bench_transcription_cache(seconds=600, realtime_factor=0.05, runs=5):
+    """
+    Transcribes the same audio with a stand-in model, first uncached and then from the
+    transcription cache, as for a re-upload of the video: fingerprinting the audio again,
+    and with the fingerprint already known (as the agent passes the .pcm file's hash).
+    """
+    import statistics
+    from subtitle_generator import generate_subtitles
+    from transcription_cache import TranscriptionCache, audio_fingerprint
+
+    register_fake_whisper_model("fake-cache", realtime_factor)
+    results = {"audio_seconds": seconds}
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TranscriptionCache(os.path.join(tmp, "transcriptions.sqlite3"))
+        pcm_path = write_synthetic_pcm(os.path.join(tmp, "audio.pcm"), seconds)
+        srt_path = os.path.join(tmp, "out.srt")
+        options = {"device": "cpu", "cache": cache}
+
+        output, elapsed = _timed(generate_subtitles, pcm_path, srt_path, "fake-cache", **options)
+        if not output:
+            raise RuntimeError("Transcription failed")
+        with open(srt_path, "r", encoding="utf-8") as f:
+            expected = f.read()
+        results["miss"] = {"seconds": elapsed}
+
+        reupload_path = os.path.join(tmp, "reupload.pcm")
+        with open(pcm_path, "rb") as src, open(reupload_path, "wb") as dst:
+            dst.write(src.read())
+        samples = [_timed(generate_subtitles, reupload_path, srt_path, "fake-cache", **options)[1] for _ in range(runs)]
+        with open(srt_path, "r", encoding="utf-8") as f:
+            if f.read() != expected:
+                raise RuntimeError("Cached subtitles differ from the transcribed ones")
+        results["hit"] = {"seconds": statistics.median(samples)}
+
+        # Hitting the cache with an already known fingerprint skips hashing the audio
+        fingerprint = audio_fingerprint(pcm_path)
+        samples = [_timed(generate_subtitles, pcm_path, srt_path, "fake-cache", fingerprint=fingerprint, **options)[1]
+                   for _ in range(runs)]
+        results["hit_known_fingerprint"] = {"seconds": statistics.median(samples)}
+        results["cache"] = cache.stats()
+
+    for name in ("miss", "hit", "hit_known_fingerprint"):
+        print(f"transcription_cache[{name}]: {seconds}s of audio in {results[name]['seconds'] * 1000:.1f} ms")
+    print(f"transcription_cache: {results['cache']['bytes']} bytes on disk for {results['cache']['entries']} entries")
+    return results
+
+
+def serve_directory(directory):
+    """
+    Starts a local HTTP server for directory in a background thread.
+
+    Returns:
+        tuple: The server (call shutdown() when done) and its base URL.
+    """
+    import functools
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+    class QuietHandler(SimpleHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    class QuietServer(ThreadingHTTPServer):
+        def handle_error(self, request, client_address):
+            # Clients such as yt-dlp's probe request close connections early
+            pass
+
+    server = QuietServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def bench_download(size_mb=50, rate_limit=None):
+    """
+    Downloads a fixture file from a local HTTP server through the in-process yt-dlp downloader.
+    """
+    from youtube_downloader import download_youtube_video
+
+    with tempfile.TemporaryDirectory() as tmp:
+        serve_dir = os.path.join(tmp, "serve")
+        os.makedirs(serve_dir)
+        with open(os.path.join(serve_dir, "fixture.mp4"), "wb") as f:
+            f.write(os.urandom(size_mb * 1024 * 1024))
+
+        server, base_url = serve_directory(serve_dir)
+        progress = []
+        try:
+            output, elapsed = _timed(
+                download_youtube_video, f"{base_url}/fixture.mp4", os.path.join(tmp, "out"),
+                progress_callback=lambda downloaded, total: progress.append((downloaded, total)),
+                rate_limit=rate_limit
+            )
+        finally:
+            server.shutdown()
+
+        if not output or os.path.getsize(output) != size_mb * 1024 * 1024:
+            raise RuntimeError(f"Download failed or incomplete: {output}")
+        print(f"download: {size_mb} MB in {elapsed:.2f}s ({size_mb / elapsed:.1f} MB/s), "
+              f"{len(progress)} progress updates, last {progress[-1] if progress else None}")
+        return {"seconds": elapsed, "mb_per_second": size_mb / elapsed, "progress_updates": len(progress)}
+
+
+def serve_fake_bilibili(chunk_size=4 * 1024 * 1024, chunk_latency=0.0, max_chunks=None):
+    """
+    Starts a local stand-in for Bilibili's preupload, upos chunk upload and submission endpoints.
+
+    Args:
+        chunk_size (int): Chunk size announced by the preupload response.
+        chunk_latency (float): Seconds each chunk PUT takes, to simulate the network.
+        max_chunks (int): Reject chunks after this many were accepted, to simulate an interrupted upload.
+
+    Returns:
+        tuple: The server (call shutdown() when done; server.uploads holds the received
+        chunk sizes per upload id; set server.max_chunks to change the limit; set
+        server.reject_complete to fail completing uploads) and its base URL.
+    """
+    import json
+    import uuid
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+
+    class FakeBilibiliHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, data, status=200):
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_body(self):
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/preupload":
+                return self._send_json({"OK": 0}, 404)
+            name = parse_qs(url.query)["name"][0]
+            self._send_json({
+                "OK": 1,
+                "upos_uri": f"upos://ugcfake/{uuid.uuid4().hex}{os.path.splitext(name)[1]}",
+                "endpoint": f"//127.0.0.1:{server.server_address[1]}",
+                "auth": "fake-auth",
+                "biz_id": 1,
+                "chunk_size": chunk_size,
+            })
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query, keep_blank_values=True)
+            body = self._read_body()
+            if url.path == "/x/vu/web/add":
+                return self._send_json({"code": 0, "data": {"aid": 1, "bvid": "BV1fake"}})
+            if "uploads" in query:
+                upload_id = uuid.uuid4().hex
+                server.uploads[upload_id] = {}
+                return self._send_json({"OK": 1, "upload_id": upload_id})
+            parts = server.uploads.get(query.get("uploadId", [""])[0])
+            expected = len(json.loads(body)["parts"])
+            if parts is None or len(parts) != expected or server.reject_complete:
+                return self._send_json({"OK": 0}, 400)
+            self._send_json({"OK": 1})
+
+        def do_PUT(self):
+            query = parse_qs(urlparse(self.path).query)
+            data = self._read_body()
+            with server.lock:
+                parts = server.uploads.get(query["uploadId"][0])
+                accepted = parts is not None and (server.max_chunks is None or server.accepted < server.max_chunks)
+                if accepted:
+                    server.accepted += 1
+            if parts is None:
+                # Unknown or expired upload session
+                return self._send_json({"OK": 0}, 404)
+            if not accepted or len(data) != int(query["size"][0]):
+                return self._send_json({"OK": 0}, 503)
+            time.sleep(chunk_latency)
+            parts[int(query["partNumber"][0])] = len(data)
+            self._send_json({"OK": 1})
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeBilibiliHandler)
+    server.uploads = {}
+    server.accepted = 0
+    server.max_chunks = max_chunks
+    server.reject_complete = False
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def bench_upload(size_mb=64, chunk_mb=4, chunk_latency=0.2, workers=4):
+    """
+    Uploads a fixture file to a local stand-in server with one and with several concurrent
+    chunks, then interrupts an upload halfway and resumes it.
+    """
+    from bilibili_api_uploader import BilibiliUploader, UploadError
+
+    cookies = {"SESSDATA": "fake", "bili_jct": "fake"}
+    tags = ["benchmark"]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = os.path.join(tmp, "fixture.mp4")
+        with open(video_path, "wb") as f:
+            f.write(os.urandom(size_mb * 1024 * 1024))
+        chunks = -(-size_mb // chunk_mb)
+
+        for chunk_workers in (1, workers):
+            server, base_url = serve_fake_bilibili(chunk_mb * 1024 * 1024, chunk_latency)
+            uploader = BilibiliUploader(cookies, member_url=base_url, chunk_workers=chunk_workers, scheme="http:")
+            try:
+                submission, elapsed = _timed(uploader.upload, video_path, "benchmark", "", tags)
+            finally:
+                server.shutdown()
+            if submission.get("bvid") != "BV1fake":
+                raise RuntimeError(f"Upload failed: {submission}")
+            results[f"workers_{chunk_workers}"] = {"seconds": elapsed, "mb_per_second": size_mb / elapsed}
+            print(f"upload[{chunk_workers} workers]: {size_mb} MB in {chunks} chunks, {elapsed:.2f}s "
+                  f"({size_mb / elapsed:.1f} MB/s)")
+
+        # The server stops accepting chunks halfway; the second attempt must only send the rest
+        server, base_url = serve_fake_bilibili(chunk_mb * 1024 * 1024, chunk_latency, max_chunks=chunks // 2)
+        try:
+            uploader = BilibiliUploader(cookies, member_url=base_url, chunk_workers=workers, max_retries=1, scheme="http:")
+            try:
+                uploader.upload(video_path, "benchmark", "", tags)
+                raise RuntimeError("Interrupted upload unexpectedly succeeded")
+            except UploadError:
+                pass
+            if not os.path.exists(BilibiliUploader.resume_file_path(video_path)):
+                raise RuntimeError("No resume file after an interrupted upload")
+            server.max_chunks = None
+            _, elapsed = _timed(uploader.upload, video_path, "benchmark", "", tags)
+            (parts,) = server.uploads.values()
+            if len(parts) != chunks:
+                raise RuntimeError(f"Resumed upload is missing chunks: {len(parts)}/{chunks}")
+        finally:
+            server.shutdown()
+        results["resume"] = {"seconds": elapsed, "chunks": chunks, "resumed_from": chunks // 2}
+        print(f"upload[resume]: continued after {chunks // 2}/{chunks} chunks, finished in {elapsed:.2f}s")
+
+        # A resume file whose session the server has forgotten must not be retried forever,
+        # and neither must one whose upload could not be completed
+        server, base_url = serve_fake_bilibili(chunk_mb * 1024 * 1024, 0, max_chunks=chunks // 2)
+        try:
+            uploader = BilibiliUploader(cookies, member_url=base_url, chunk_workers=workers, max_retries=1, scheme="http:")
+            try:
+                uploader.upload(video_path, "benchmark", "", tags)
+            except UploadError:
+                pass
+            server.uploads.clear()
+            server.max_chunks = None
+            uploader.upload(video_path, "benchmark", "", tags)
+            if [len(parts) for parts in server.uploads.values()] != [chunks]:
+                raise RuntimeError("Upload did not start over after its session expired")
+
+            server.reject_complete = True
+            try:
+                uploader.upload(video_path, "benchmark", "", tags)
+                raise RuntimeError("Upload unexpectedly completed")
+            except UploadError:
+                pass
+            if os.path.exists(BilibiliUploader.resume_file_path(video_path)):
+                raise RuntimeError("Resume file kept after completing the upload failed")
+        finally:
+            server.shutdown()
+        print("upload[stale session]: expired session restarted, failed completion not resumed")
+    return results
+
+
+def bench_merge(num_cues=50000):
+    """
+    Merges synthetic subtitle files whose cues are segmented differently, at increasing
+    sizes, to show the overlap alignment stays linear in the number of cues.
+    """
+    from bilingual_subtitle_merger import merge_subtitles
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (num_cues // 4, num_cues // 2, num_cues):
+            original_path = write_synthetic_srt(os.path.join(tmp, f"original_{size}.srt"), size)
+            # Translated cues are shorter and do not line up with the original ones
+            translated_path = write_synthetic_srt(
+                os.path.join(tmp, f"translated_{size}.srt"), size * 5 // 4, cue_ms=1700, gap_ms=300,
+                text="这是第 {} 行合成字幕。"
+            )
+            output, elapsed = _timed(merge_subtitles, original_path, translated_path, os.path.join(tmp, f"merged_{size}.srt"))
+            if not output:
+                raise RuntimeError(f"Merge failed for {size} cues")
+            results[size] = {"seconds": elapsed, "us_per_cue": elapsed / size * 1e6}
+            print(f"merge: {size} + {size * 5 // 4} cues in {elapsed:.2f}s ({elapsed / size * 1e6:.1f} us per original cue)")
+    return results
+
+
+def bench_mux(seconds=120, size="1280x720", workers=None, segment_seconds=10):
+    """
+    Adds generated bilingual subtitles to an ffmpeg test clip: as a soft subtitle track
+    (stream copy), burned in by one ffmpeg process, and burned in segment-parallel.
+    """
+    import subprocess
+    from subtitle_muxer import mux_soft_subtitles, burn_subtitles, BURN_PRESET, BURN_CRF
+
+    workers = workers or os.cpu_count() or 1
+    results = {"video_seconds": seconds, "size": size, "workers": workers}
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = make_test_video(os.path.join(tmp, "clip.mp4"), seconds, size)
+        srt_path = write_synthetic_srt(os.path.join(tmp, "bilingual.srt"), seconds * 1000 // 2500,
+                                       text="Synthetic line {0}\n合成字幕 {0}")
+
+        output, elapsed = _timed(mux_soft_subtitles, video_path, srt_path, os.path.join(tmp, "soft.mp4"))
+        if not output:
+            raise RuntimeError("Soft subtitle muxing failed")
+        results["soft"] = {"seconds": elapsed, "realtime_factor": elapsed / seconds}
+
+        # Baseline: one ffmpeg process rendering and encoding the whole clip with all its threads
+        _, elapsed = _timed(subprocess.run, [
+            "ffmpeg", "-nostdin", "-y", "-i", "clip.mp4", "-vf", "subtitles=bilingual.srt",
+            "-c:v", "libx264", "-preset", BURN_PRESET, "-crf", str(BURN_CRF), "-pix_fmt", "yuv420p",
+            "-c:a", "copy", "single.mp4"
+        ], cwd=tmp, capture_output=True, check=True)
+        results["burn_single"] = {"seconds": elapsed, "realtime_factor": elapsed / seconds}
+
+        output, elapsed = _timed(burn_subtitles, video_path, srt_path, os.path.join(tmp, "burned.mp4"), workers,
+                                 segment_seconds)
+        if not output:
+            raise RuntimeError("Subtitle burn-in failed")
+        results["burn_segmented"] = {"seconds": elapsed, "realtime_factor": elapsed / seconds}
+
+    for mode in ("soft", "burn_single", "burn_segmented"):
+        print(f"mux[{mode}]: {seconds}s {size} clip in {results[mode]['seconds']:.2f}s "
+              f"(RTF {results[mode]['realtime_factor']:.3f})")
+    print(f"mux: segmented burn-in with {workers} workers is "
+          f"{results['burn_single']['seconds'] / results['burn_segmented']['seconds']:.1f}x single-process")
+    return results
+
+
+def bench_srt(num_cues=100000):
+    """
+    Parses and serializes a large SRT file with the in-project subtitles module and, if installed, with pysrt.
+    """
+    import subtitles
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        srt_path = write_synthetic_srt(os.path.join(tmp, "input.srt"), num_cues, cue_ms=1234, gap_ms=321)
+
+        cues, parse_seconds = _timed(subtitles.read_srt, srt_path)
+        _, write_seconds = _timed(subtitles.write_srt, cues, os.path.join(tmp, "subtitles.srt"))
+        results["subtitles"] = {"parse_seconds": parse_seconds, "write_seconds": write_seconds}
+        # Millisecond precision must survive the round trip
+        if cues[-1].end != (num_cues - 1) * (1234 + 321) + 1234:
+            raise RuntimeError(f"Timestamp mismatch: {cues[-1]}")
+
+        try:
+            import pysrt
+        except ImportError:
+            pysrt = None
+        if pysrt is not None:
+            subs, parse_seconds = _timed(pysrt.open, srt_path, encoding="utf-8")
+            _, write_seconds = _timed(subs.save, os.path.join(tmp, "pysrt.srt"), encoding="utf-8")
+            results["pysrt"] = {"parse_seconds": parse_seconds, "write_seconds": write_seconds}
+
+    for name, result in results.items():
+        print(f"srt[{name}]: {num_cues} cues, parse {result['parse_seconds']:.2f}s, write {result['write_seconds']:.2f}s")
+    if "pysrt" not in results:
+        print("srt: pysrt is not installed, skipping comparison")
+    return results
+
+
+# Modules the API process must not import before the first job needs them
+HEAVY_MODULES = ("whisper", "torch", "numpy", "selenium", "yt_dlp", "google.cloud", "requests")
+
+_STARTUP_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+import flask_api
+seconds = time.perf_counter() - start
+print(json.dumps({
+    "seconds": seconds,
+    "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    "heavy_modules": [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+def bench_startup(runs=5, max_seconds=1.0):
+    """
+    Imports flask_api in fresh interpreters and checks the API process starts fast and lean:
+    under max_seconds (median), without importing any of HEAVY_MODULES and without
+    creating files in the working directory.
+
+    Raises:
+        RuntimeError: If the startup budget is exceeded.
+    """
+    import statistics
+    import subprocess
+    import sys
+
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Run in a scratch directory, to catch files created on import
+        env = dict(os.environ, PYTHONPATH=repo_dir, WHISPER_PRELOAD="0")
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, "-c", _STARTUP_SCRIPT % (HEAVY_MODULES,)], cwd=tmp, env=env,
+                                    capture_output=True, text=True, check=True).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+        created_files = sorted(os.listdir(tmp))
+
+    results = {
+        "seconds": statistics.median(sample["seconds"] for sample in samples),
+        "max_rss_bytes": max(sample["max_rss_bytes"] for sample in samples),
+        "heavy_modules": sorted({name for sample in samples for name in sample["heavy_modules"]}),
+        "created_files": created_files,
+    }
+    print(f"startup: import flask_api in {results['seconds']:.3f}s (median of {runs}), "
+          f"{results['max_rss_bytes'] / 1024 / 1024:.0f} MB RSS, heavy modules: {results['heavy_modules'] or 'none'}")
+    if results["heavy_modules"]:
+        raise RuntimeError(f"flask_api imports heavy modules at startup: {', '.join(results['heavy_modules'])}")
+    if created_files:
+        raise RuntimeError(f"Importing flask_api created files: {', '.join(created_files)}")
+    if results["seconds"] > max_seconds:
+        raise RuntimeError(f"flask_api import took {results['seconds']:.2f}s, budget is {max_seconds:.2f}s")
+    return results
+
+
+def _profile_summary(spans):
+    stages = {}
+    steps = {}
+    for span in spans:
+        summary = {key: span[key] for key in ("wall_seconds", "cpu_seconds", "child_cpu_seconds", "peak_rss_bytes")}
+        summary["counters"] = span["counters"]
+        if span["parent"] is None:
+            stages[span["name"]] = dict(summary, status=span["status"])
+        else:
+            step = steps.setdefault(span["name"], {"count": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+            step["count"] += 1
+            step["wall_seconds"] += span["wall_seconds"]
+            step["cpu_seconds"] += span["cpu_seconds"]
+    return stages, steps
+
+
+def bench_pipeline(seconds=60, model_name="tiny", streaming=False, translate_latency=0.05):
+    """
+    Runs process_video end to end on a generated test video: downloaded from a local
+    HTTP server, translated by the fake client and uploaded to the stand-in Bilibili
+    server. A second run of the same video measures a resumed run, which reuses every
+    stage but the upload.
+    """
+    from bilibili_api_uploader import BilibiliUploader
+    from main_agent import YouTubeToBilibiliAgent
+    from translation_cache import TranslationCache
+    from transcription_cache import TranscriptionCache
+
+    results = {"video_seconds": seconds, "model": model_name, "streaming": streaming}
+    with tempfile.TemporaryDirectory() as tmp:
+        serve_dir = os.path.join(tmp, "serve")
+        os.makedirs(serve_dir)
+        make_test_video(os.path.join(serve_dir, "fixture.mp4"), seconds)
+        video_server, base_url = serve_directory(serve_dir)
+        bilibili_server, bilibili_url = serve_fake_bilibili()
+        profile_dir = os.path.join(tmp, "profiles")
+        agent = YouTubeToBilibiliAgent(
+            work_dir=os.path.join(tmp, "work"), whisper_model=model_name, whisper_device="cpu", streaming=streaming,
+            profile_dir=profile_dir, skip_uploaded=False,
+            translate_client=FakeTranslateClient(latency=translate_latency),
+            translation_cache=TranslationCache(":memory:"),
+            transcription_cache=TranscriptionCache(os.path.join(tmp, "transcriptions.sqlite3")),
+            bilibili_uploader=BilibiliUploader({"SESSDATA": "fake", "bili_jct": "fake"}, member_url=bilibili_url,
+                                               scheme="http:"),
+        )
+        try:
+            # Model loading is measured by the transcribe benchmark, not here
+            agent.warm_up()
+            for run in ("cold", "resumed"):
+                profiles_before = set(os.listdir(profile_dir)) if os.path.isdir(profile_dir) else set()
+                result, elapsed = _timed(
+                    agent.process_video, f"{base_url}/fixture.mp4", "benchmark", "", ["benchmark"]
+                )
+                if not result["success"] or not result["upload_success"]:
+                    raise RuntimeError(f"Pipeline failed in {run} run: {result['error']}")
+                (profile_name,) = set(os.listdir(profile_dir)) - profiles_before
+                with open(os.path.join(profile_dir, profile_name), "r", encoding="utf-8") as f:
+                    stages, steps = _profile_summary(json.load(f)["spans"])
+                results[run] = {
+                    "seconds": elapsed,
+                    "realtime_factor": elapsed / seconds,
+                    "stages": stages,
+                    "steps": steps,
+                }
+                print(f"pipeline[{run}]: {seconds}s video in {elapsed:.2f}s (RTF {elapsed / seconds:.3f})")
+                for stage, timing in stages.items():
+                    print(f"  {stage}: {timing['wall_seconds']:.2f}s wall, {timing['cpu_seconds']:.2f}s cpu, "
+                          f"{timing['peak_rss_bytes'] / 1024 / 1024:.0f} MB peak ({timing['status']})")
+        finally:
+            video_server.shutdown()
+            bilibili_server.shutdown()
+    return results
+
+
+def bench_reprocess(seconds=10):
+    """
+    Checks that purged and reprocessed videos are uploaded again: processes a generated
+    test video with a stand-in model, reruns it (skipped as already uploaded), purges it
+    from the index and reruns it, then reruns it with skip_uploaded=False, counting the
+    uploads received by the stand-in Bilibili server after each run.
+    """
+    from bilibili_api_uploader import BilibiliUploader
+    from main_agent import YouTubeToBilibiliAgent
+    from translation_cache import TranslationCache
+    from transcription_cache import TranscriptionCache
+
+    register_fake_whisper_model()
+    results = {"video_seconds": seconds}
+    with tempfile.TemporaryDirectory() as tmp:
+        serve_dir = os.path.join(tmp, "serve")
+        os.makedirs(serve_dir)
+        make_test_video(os.path.join(serve_dir, "fixture.mp4"), seconds)
+        video_server, base_url = serve_directory(serve_dir)
+        bilibili_server, bilibili_url = serve_fake_bilibili()
+
+        def make_agent(skip_uploaded):
+            return YouTubeToBilibiliAgent(
+                work_dir=os.path.join(tmp, "work"), whisper_model="fake", whisper_device="cpu",
+                skip_uploaded=skip_uploaded, translate_client=FakeTranslateClient(latency=0),
+                translation_cache=TranslationCache(":memory:"),
+                transcription_cache=TranscriptionCache(os.path.join(tmp, "transcriptions.sqlite3")),
+                bilibili_uploader=BilibiliUploader({"SESSDATA": "fake", "bili_jct": "fake"},
+                                                   member_url=bilibili_url, scheme="http:"),
+            )
+
+        agent = make_agent(skip_uploaded=True)
+        # Run name, agent, whether to purge the index first, expected total uploads after the run
+        runs = [
+            ("first", agent, False, 1),
+            ("already_uploaded", agent, False, 1),
+            ("purged", agent, True, 2),
+            ("reprocess", make_agent(skip_uploaded=False), False, 3),
+        ]
+        try:
+            for run, run_agent, purge, expected_uploads in runs:
+                if purge:
+                    run_agent.purge_videos()
+                result, elapsed = _timed(
+                    run_agent.process_video, f"{base_url}/fixture.mp4", "benchmark", "", ["benchmark"]
+                )
+                if not result["success"] or not result["upload_success"]:
+                    raise RuntimeError(f"Pipeline failed in {run} run: {result['error']}")
+                uploads = len(bilibili_server.uploads)
+                results[run] = {"seconds": elapsed, "uploads": uploads, "skipped": result["skipped"]}
+                print(f"reprocess[{run}]: {elapsed:.2f}s, {uploads} uploads in total"
+                      f"{' (skipped)' if result['skipped'] else ''}")
+                if uploads != expected_uploads:
+                    raise RuntimeError(f"Expected {expected_uploads} uploads after the {run} run, got {uploads}")
+        finally:
+            video_server.shutdown()
+            bilibili_server.shutdown()
+    return results
+
+
+BENCHMARKS = {
+    "translate": bench_translate,
+    "transcribe": bench_transcribe,
+    "download": bench_download,
+    "upload": bench_upload,
+    "merge": bench_merge,
+    "srt": bench_srt,
+    "pipeline": bench_pipeline,
+    "reprocess": bench_reprocess,
+    "startup": bench_startup,
+    "memory": bench_memory,
+    "engines": bench_engines,
+    "transcription_cache": bench_transcription_cache,
+    "mux": bench_mux,
+}
+
+
+def _environment():
+    import platform
+    import subprocess
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "time": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_all():
+    """
+    Runs every benchmark with its default settings. A failing benchmark (e.g. because
+    Whisper or ffmpeg is not installed) is reported as an error instead of stopping the run.
+    """
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        print(f"=== {name} ===")
+        try:
+            results[name] = bench()
+        except Exception as e:
+            print(f"{name} failed: {e}")
+            results[name] = {"error": str(e)}
+    return results
+
+
+def _timings(results, prefix=""):
+    """
+    Flattens the "seconds" values of a results dict into {"path.to.seconds": value}.
+    """
+    timings = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            timings.update(_timings(value, f"{path}."))
+        elif isinstance(value, (int, float)) and key.endswith("seconds") and key != "video_seconds":
+            timings[path] = value
+    return timings
+
+
+def compare_results(baseline_path, current_path, threshold=0.1):
+    """
+    Compares the timings of two results files written with --json.
+
+    Returns:
+        list: (timing path, baseline seconds, current seconds, ratio) for every timing in both files.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = _timings(json.load(f)["results"])
+    with open(current_path, "r", encoding="utf-8") as f:
+        current = _timings(json.load(f)["results"])
+
+    rows = []
+    for path in sorted(baseline.keys() & current.keys()):
+        ratio = current[path] / baseline[path] if baseline[path] else float("inf")
+        rows.append((path, baseline[path], current[path], ratio))
+        marker = "  REGRESSION" if ratio > 1 + threshold else ("  improved" if ratio < 1 - threshold else "")
+        print(f"{path}: {baseline[path]:.3f}s -> {current[path]:.3f}s ({ratio:.2f}x){marker}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the pipeline stages")
+    parser.add_argument("--json", metavar="PATH", help="Write the results, with commit and machine details, as JSON")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    translate_parser = subparsers.add_parser("translate", help="Subtitle translation batching")
+    translate_parser.add_argument("--cues", type=int, default=1000)
+    translate_parser.add_argument("--latency", type=float, default=0.05, help="Fake API round-trip time in seconds")
+    translate_parser.add_argument("--workers", type=int, default=4)
+
+    transcribe_parser = subparsers.add_parser("transcribe", help="Single-pass vs chunked Whisper transcription")
+    transcribe_parser.add_argument("--seconds", type=int, default=300, help="Length of the synthetic audio")
+    transcribe_parser.add_argument("--model", default="tiny")
+    transcribe_parser.add_argument("--workers", type=int, default=None)
+    transcribe_parser.add_argument("--threads-per-worker", type=int, default=2)
+
+    download_parser = subparsers.add_parser("download", help="In-process yt-dlp download from a local HTTP server")
+    download_parser.add_argument("--size-mb", type=int, default=50)
+    download_parser.add_argument("--rate-limit", type=int, default=None, help="Bytes per second")
+
+    merge_parser = subparsers.add_parser("merge", help="Time-overlap subtitle alignment")
+    merge_parser.add_argument("--cues", type=int, default=50000)
+
+    srt_parser = subparsers.add_parser("srt", help="SRT parse/serialize speed against pysrt")
+    srt_parser.add_argument("--cues", type=int, default=100000)
+
+    upload_parser = subparsers.add_parser("upload", help="Chunked HTTP upload to a local stand-in server")
+    upload_parser.add_argument("--size-mb", type=int, default=64)
+    upload_parser.add_argument("--chunk-mb", type=int, default=4)
+    upload_parser.add_argument("--chunk-latency", type=float, default=0.2, help="Fake seconds per chunk")
+    upload_parser.add_argument("--workers", type=int, default=4)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="End-to-end process_video on a generated test video")
+    pipeline_parser.add_argument("--seconds", type=int, default=60, help="Length of the test video")
+    pipeline_parser.add_argument("--model", default="tiny")
+    pipeline_parser.add_argument("--streaming", action="store_true")
+    pipeline_parser.add_argument("--translate-latency", type=float, default=0.05)
+
+    reprocess_parser = subparsers.add_parser("reprocess", help="Purged and reprocessed videos are uploaded again; "
+                                                               "fails if an upload is missing or replayed")
+    reprocess_parser.add_argument("--seconds", type=int, default=10, help="Length of the test video")
+
+    startup_parser = subparsers.add_parser("startup", help="API import time and memory; fails if over budget")
+    startup_parser.add_argument("--runs", type=int, default=5)
+    startup_parser.add_argument("--max-seconds", type=float, default=1.0)
+
+    memory_parser = subparsers.add_parser("memory", help="Windowed vs whole-file transcription peak memory; "
+                                                         "fails if windowed memory grows with audio length")
+    memory_parser.add_argument("--short-seconds", type=int, default=1800)
+    memory_parser.add_argument("--long-seconds", type=int, default=10800)
+    memory_parser.add_argument("--tolerance-mb", type=int, default=64)
+
+    engines_parser = subparsers.add_parser("engines", help="Real-time factor and peak memory of each transcription engine")
+    engines_parser.add_argument("--seconds", type=int, default=120, help="Length of the synthetic audio")
+    engines_parser.add_argument("--model", default="tiny")
+    engines_parser.add_argument("--engine", action="append", metavar="ENGINE[:COMPUTE_TYPE]",
+                                help="Engine to compare, e.g. faster-whisper:int8 (repeatable)")
+
+    transcription_cache_parser = subparsers.add_parser("transcription_cache", help="Transcription cache miss vs hit")
+    transcription_cache_parser.add_argument("--seconds", type=int, default=600, help="Length of the synthetic audio")
+    transcription_cache_parser.add_argument("--realtime-factor", type=float, default=0.05,
+                                            help="Fake model seconds per second of audio")
+    transcription_cache_parser.add_argument("--runs", type=int, default=5)
+
+    mux_parser = subparsers.add_parser("mux", help="Soft subtitle muxing vs single-process and segmented burn-in")
+    mux_parser.add_argument("--seconds", type=int, default=120, help="Length of the test clip")
+    mux_parser.add_argument("--size", default="1280x720")
+    mux_parser.add_argument("--workers", type=int, default=None)
+    mux_parser.add_argument("--segment-seconds", type=float, default=10)
+
+    subparsers.add_parser("all", help="Run every benchmark with default settings")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare the timings of two --json results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Relative change reported as a regression")
+
+    args = parser.parse_args()
+    results = None
+    if args.benchmark == "translate":
+        results = bench_translate(args.cues, args.latency, args.workers)
+    elif args.benchmark == "transcribe":
+        results = bench_transcribe(args.seconds, args.model, args.workers, args.threads_per_worker)
+    elif args.benchmark == "download":
+        results = bench_download(args.size_mb, args.rate_limit)
+    elif args.benchmark == "merge":
+        results = bench_merge(args.cues)
+    elif args.benchmark == "srt":
+        results = bench_srt(args.cues)
+    elif args.benchmark == "upload":
+        results = bench_upload(args.size_mb, args.chunk_mb, args.chunk_latency, args.workers)
+    elif args.benchmark == "pipeline":
+        results = bench_pipeline(args.seconds, args.model, args.streaming, args.translate_latency)
+    elif args.benchmark == "reprocess":
+        results = bench_reprocess(args.seconds)
+    elif args.benchmark == "startup":
+        results = bench_startup(args.runs, args.max_seconds)
+    elif args.benchmark == "memory":
+        results = bench_memory(args.short_seconds, args.long_seconds, args.tolerance_mb)
+    elif args.benchmark == "engines":
+        engines = [tuple(engine.split(":", 1)) if ":" in engine else (engine, None) for engine in args.engine or []]
+        results = bench_engines(args.seconds, args.model, engines)
+    elif args.benchmark == "transcription_cache":
+        results = bench_transcription_cache(args.seconds, args.realtime_factor, args.runs)
+    elif args.benchmark == "mux":
+        results = bench_mux(args.seconds, args.size, args.workers, args.segment_seconds)
+    elif args.benchmark == "all":
+        results = run_all()
+    elif args.benchmark == "compare":
+        compare_results(args.baseline, args.current, args.threshold)
+
+    if args.json and results is not None:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "benchmark": args.benchmark,
+                "arguments": {key: value for key, value in vars(args).items() if key not in ("benchmark", "json")},
+                "environment": _environment(),
+                "results": results,
+            }, f, indent=2)
+        print(f"Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import span, record
+
+MEMBER_URL = os.environ.get("BILIBILI_MEMBER_URL", "https://member.bilibili.com")
+COOKIES_FILE = os.environ.get("BILIBILI_COOKIES_FILE", "./bilibili_cookies.json")
+CHUNK_WORKERS = int(os.environ.get("BILIBILI_UPLOAD_CHUNK_WORKERS", "3"))
+MAX_CHUNK_RETRIES = 5
+# Default partition (tid) for reposted videos
+DEFAULT_TID = 122
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36"
+
+
+class UploadError(Exception):
+    pass
+
+
+class UploadSessionError(UploadError):
+    """
+    The upos upload session was rejected or could not be completed; resuming it cannot succeed.
+    """
+
+
+def load_cookies(cookies_file=COOKIES_FILE):
+    """
+    Loads Bilibili login cookies from a JSON file.
+
+    The file may hold a {name: value} object or a list of {"name", "value"} dicts as
+    returned by Selenium's driver.get_cookies().
+
+    Returns:
+        dict: Cookie names to values, or None if the file does not exist.
+    """
+    if not os.path.exists(cookies_file):
+        return None
+    with open(cookies_file, "r", encoding="utf-8") as f:
+        cookies = json.load(f)
+    if isinstance(cookies, list):
+        cookies = {cookie["name"]: cookie["value"] for cookie in cookies}
+    return cookies
+
+
+class BilibiliUploader:
+    """
+    Uploads videos with Bilibili's chunked upos protocol (preupload, init, chunk PUTs, complete)
+    and submits them, over one pooled requests.Session.
+
+    Chunks are uploaded concurrently and retried individually. Acknowledged chunks are
+    recorded in a resume file next to the video, so an interrupted upload continues
+    from where it stopped instead of starting over.
+    """
+
+    def __init__(self, cookies, member_url=MEMBER_URL, chunk_workers=CHUNK_WORKERS,
+                 max_retries=MAX_CHUNK_RETRIES, scheme="https:"):
+        self.member_url = member_url.rstrip("/")
+        self.chunk_workers = chunk_workers
+        self.max_retries = max_retries
+        self.scheme = scheme
+        self.csrf = cookies.get("bili_jct", "")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(chunk_workers, 4))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.cookies.update(cookies)
+        self.session.headers.update({"User-Agent": USER_AGENT, "Referer": f"{self.member_url}/"})
+
+    @staticmethod
+    def resume_file_path(video_path):
+        return f"{video_path}.upload.json"
+
+    def _load_resume_state(self, video_path):
+        resume_path = self.resume_file_path(video_path)
+        if not os.path.exists(resume_path):
+            return None
+        try:
+            with open(resume_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        stat = os.stat(video_path)
+        # Only resume an upload of the very same file
+        if state.get("size") != stat.st_size or state.get("mtime") != stat.st_mtime:
+            return None
+        return state
+
+    def _save_resume_state(self, video_path, state):
+        resume_path = self.resume_file_path(video_path)
+        tmp_path = f"{resume_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, resume_path)
+
+    def _upload_url(self, state):
+        return f"{self.scheme}{state['endpoint']}/{state['upos_uri'].replace('upos://', '')}"
+
+    def _start_upload(self, video_path):
+        name = os.path.basename(video_path)
+        size = os.path.getsize(video_path)
+        response = self.session.get(f"{self.member_url}/preupload", params={
+            "name": name,
+            "size": size,
+            "r": "upos",
+            "profile": "ugcupos/bup",
+            "ssl": 0,
+        }, timeout=30)
+        response.raise_for_status()
+        preupload = response.json()
+        if preupload.get("OK") != 1:
+            raise UploadError(f"Preupload failed: {preupload}")
+
+        stat = os.stat(video_path)
+        state = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "name": name,
+            "upos_uri": preupload["upos_uri"],
+            "endpoint": preupload["endpoint"],
+            "auth": preupload["auth"],
+            "biz_id": preupload["biz_id"],
+            "chunk_size": preupload["chunk_size"],
+            "parts": {},
+        }
+        response = self.session.post(
+            self._upload_url(state), params={"uploads": "", "output": "json"},
+            headers={"X-Upos-Auth": state["auth"]}, timeout=30
+        )
+        response.raise_for_status()
+        state["upload_id"] = response.json()["upload_id"]
+        return state
+
+    def _upload_chunk(self, video_path, state, index, chunks):
+        start = index * state["chunk_size"]
+        end = min(start + state["chunk_size"], state["size"])
+        with open(video_path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+
+        for attempt in range(self.max_retries):
+            try:
+                response = self.session.put(self._upload_url(state), params={
+                    "partNumber": index + 1,
+                    "uploadId": state["upload_id"],
+                    "chunk": index,
+                    "chunks": chunks,
+                    "size": len(data),
+                    "start": start,
+                    "end": end,
+                    "total": state["size"],
+                }, data=data, headers={"X-Upos-Auth": state["auth"]}, timeout=120)
+                response.raise_for_status()
+                return len(data)
+            except requests.RequestException as e:
+                status = e.response.status_code if e.response is not None else None
+                if status is not None and 400 <= status < 500 and status not in (408, 429):
+                    # E.g. an expired upload id; retrying the chunk cannot help
+                    raise UploadSessionError(f"Chunk {index + 1}/{chunks} rejected: {e}")
+                if attempt == self.max_retries - 1:
+                    raise UploadError(f"Chunk {index + 1}/{chunks} failed after {self.max_retries} attempts: {e}")
+                delay = 2 ** attempt
+                print(f"Chunk {index + 1}/{chunks} failed ({e}), retrying in {delay}s")
+                time.sleep(delay)
+
+    def _complete_upload(self, state, chunks):
+        try:
+            response = self.session.post(self._upload_url(state), params={
+                "output": "json",
+                "name": state["name"],
+                "profile": "ugcupos/bup",
+                "uploadId": state["upload_id"],
+                "biz_id": state["biz_id"],
+            }, json={"parts": [{"partNumber": i + 1, "eTag": "etag"} for i in range(chunks)]},
+                headers={"X-Upos-Auth": state["auth"]}, timeout=60)
+            response.raise_for_status()
+            completed = response.json().get("OK") == 1
+        except (requests.RequestException, ValueError) as e:
+            raise UploadSessionError(f"Completing upload failed: {e}")
+        if not completed:
+            raise UploadSessionError(f"Completing upload failed: {response.text}")
+
+    def upload_file(self, video_path, progress_callback=None):
+        """
+        Uploads the video file, resuming a previous interrupted upload of the same file.
+
+        The resume file is only kept when chunk transfers fail. If the stored session is
+        rejected the upload starts over, and if completing the upload fails the resume
+        file is dropped, so the next attempt does not fail the same way.
+
+        Args:
+            video_path (str): The path to the video file.
+            progress_callback (callable): Optional function called with (uploaded_bytes, total_bytes).
+
+        Returns:
+            str: The uploaded file name to use when submitting the video.
+        """
+        state = self._load_resume_state(video_path)
+        if state:
+            print(f"Resuming upload: {len(state['parts'])} chunks already uploaded")
+            try:
+                return self._upload_parts(video_path, state, progress_callback)
+            except UploadSessionError as e:
+                print(f"Stored upload session failed, starting over: {e}")
+
+        state = self._start_upload(video_path)
+        self._save_resume_state(video_path, state)
+        return self._upload_parts(video_path, state, progress_callback)
+
+    def _upload_parts(self, video_path, state, progress_callback):
+        # Uploads the chunks missing from state and completes the upload
+        chunks = max(1, -(-state["size"] // state["chunk_size"]))
+        pending = [i for i in range(chunks) if str(i) not in state["parts"]]
+        uploaded = sum(
+            min(state["chunk_size"], state["size"] - i * state["chunk_size"])
+            for i in range(chunks) if str(i) in state["parts"]
+        )
+        lock = threading.Lock()
+        sent = [0]
+
+        def upload(index):
+            nonlocal uploaded
+            size = self._upload_chunk(video_path, state, index, chunks)
+            with lock:
+                state["parts"][str(index)] = True
+                uploaded += size
+                sent[0] += size
+                self._save_resume_state(video_path, state)
+                if progress_callback:
+                    progress_callback(uploaded, state["size"])
+
+        try:
+            with span("bilibili.upload_chunks", chunks=len(pending)), \
+                    ThreadPoolExecutor(max_workers=self.chunk_workers) as executor:
+                # list() re-raises the first chunk failure; the resume file keeps the finished chunks
+                list(executor.map(upload, pending))
+        except UploadSessionError:
+            # Only failed chunk transfers are worth resuming
+            os.remove(self.resume_file_path(video_path))
+            raise
+        finally:
+            record("bytes_uploaded", sent[0])
+
+        try:
+            self._complete_upload(state, chunks)
+        finally:
+            os.remove(self.resume_file_path(video_path))
+        return os.path.splitext(os.path.basename(state["upos_uri"]))[0]
+
+    def submit(self, filename, title, description, tags, source_url=None, tid=DEFAULT_TID):
+        """
+        Submits an uploaded video.
+
+        Returns:
+            dict: The submission data, including "aid" and "bvid".
+        """
+        response = self.session.post(f"{self.member_url}/x/vu/web/add", params={"csrf": self.csrf}, json={
+            "copyright": 2,
+            "source": source_url or "YouTube",
+            "title": title,
+            "desc": description,
+            "tag": ",".join(tags),
+            "tid": tid,
+            "videos": [{"filename": filename, "title": title, "desc": ""}],
+        }, timeout=30)
+        response.raise_for_status()
+        result = response.json()
+        if result.get("code") != 0:
+            raise UploadError(f"Submission failed: {result.get('message')}")
+        return result["data"]
+
+    def upload(self, video_path, title, description, tags, source_url=None, progress_callback=None):
+        """
+        Uploads and submits a video.
+
+        Returns:
+            dict: The submission data, including "aid" and "bvid".
+        """
+        filename = self.upload_file(video_path, progress_callback)
+        return self.submit(filename, title, description, tags, source_url)
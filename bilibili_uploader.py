@@ -1,101 +1,142 @@
 import os
 import time
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
-
-def upload_video_to_bilibili(video_path, title, description, tags):
+from bilibili_api_uploader import BilibiliUploader, load_cookies
+from metrics import span, record
+
+def upload_video_to_bilibili(video_path, title, description, tags, source_url=None, progress_callback=None,
+                             uploader=None):
     """
-    Uploads a video to Bilibili using Selenium.
+    Uploads a video to Bilibili.
+
+    Uses the chunked HTTP upload when login cookies are available (see
+    bilibili_api_uploader.load_cookies) and falls back to the Selenium flow otherwise
+    or if uploading the file fails. A failed HTTP upload leaves a resume file, so the
+    next attempt continues from the last uploaded chunk. Once the file is uploaded a
+    failed submission is returned as a failure, since it may have gone through and a
+    browser upload could publish the video twice.
 
     Args:
         video_path (str): The absolute path to the video file.
         title (str): The title of the video.
         description (str): The description of the video.
         tags (list): A list of tags for the video.
+        source_url (str): Optional URL of the original video.
+        progress_callback (callable): Optional function called with (uploaded_bytes, total_bytes).
+        uploader (BilibiliUploader): Optional uploader to use instead of one built from the cookies file.
 
     Returns:
-        bool: True if upload is successful, False otherwise.
+        dict: The submission if upload is successful, None otherwise. It has the "method"
+        used ("api" or "browser") and, for API uploads, the "aid" and "bvid" of the video.
     """
-    # Initialize Chrome WebDriver
-    # Make sure you have chromedriver installed and in your PATH, or specify its path.
-    # For sandbox environment, usually chromedriver is pre-installed.
-    service = Service(executable_path="/usr/bin/chromedriver")
-    options = webdriver.ChromeOptions()
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--headless") # Run in headless mode
-    driver = webdriver.Chrome(service=service, options=options)
+    if uploader is None:
+        cookies = load_cookies()
+        uploader = BilibiliUploader(cookies) if cookies else None
+    if uploader:
+        try:
+            filename = uploader.upload_file(video_path, progress_callback)
+        except Exception as e:
+            print(f"HTTP upload failed, falling back to browser upload: {e}")
+        else:
+            try:
+                submission = uploader.submit(filename, title, description, tags, source_url)
+            except Exception as e:
+                print(f"Submitting the uploaded video failed: {e}")
+                return None
+            print(f"Video uploaded successfully: {submission.get('bvid')}")
+            return {"method": "api", "aid": submission.get("aid"), "bvid": submission.get("bvid")}
+    if upload_video_with_selenium(video_path, title, description, tags):
+        return {"method": "browser"}
+    return None
+
+def upload_video_with_selenium(video_path, title, description, tags):
+    """
+    Uploads a video to Bilibili using Selenium, with a logged-in driver leased from the browser pool.
+
+    Args:
+        video_path (str): The absolute path to the video file.
+        title (str): The title of the video.
+        description (str): The description of the video.
+        tags (list): A list of tags for the video.
 
+    Returns:
+        bool: True if upload is successful, False otherwise.
+    """
     try:
-        # Navigate to Bilibili upload page
-        driver.get("https://member.bilibili.com/video/upload.html")
-
-        # Wait for the upload button to be present and clickable
-        upload_button = WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.XPATH, "//input[@type=\"file\"]"))
-        )
-        
-        # Send the video file path to the input element
-        upload_button.send_keys(video_path)
-
-        print(f"Uploading video: {video_path}")
-
-        # Wait for upload to start and progress bar to appear (adjust as needed)
-        WebDriverWait(driver, 120).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "upload-progress-v2"))
-        )
-        print("Video upload started...")
-
-        # Wait for upload to complete (progress bar disappears or success message appears)
-        WebDriverWait(driver, 600).until(
-            EC.invisibility_of_element_located((By.CLASS_NAME, "upload-progress-v2"))
-        )
-        print("Video upload completed.")
-
-        # Fill in video title
-        title_input = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "video-title-input"))
-        )
-        title_input.clear()
-        title_input.send_keys(title)
-        print(f"Set title: {title}")
-
-        # Fill in video description
-        description_textarea = driver.find_element(By.CLASS_NAME, "description-textarea")
-        description_textarea.clear()
-        description_textarea.send_keys(description)
-        print(f"Set description: {description}")
-
-        # Add tags (this part might need adjustment based on Bilibili's UI)
-        # Bilibili's tag input is dynamic, so we might need to simulate typing and selecting
-        tag_input = driver.find_element(By.CLASS_NAME, "tag-input")
-        for tag in tags:
-            tag_input.send_keys(tag)
-            tag_input.send_keys(Keys.ENTER) # Simulate pressing Enter after each tag
-            time.sleep(0.5) # Small delay
-        print(f"Set tags: {', '.join(tags)}")
-
-        # Click the submit button (this XPath might need to be more specific)
-        submit_button = driver.find_element(By.XPATH, "//div[contains(@class, 'submit-btn') and text()='立即投稿']")
-        submit_button.click()
-        print("Clicked submit button.")
-
-        # Wait for success message or redirection
-        WebDriverWait(driver, 30).until(
-            EC.url_contains("member.bilibili.com/video/submission") # Or check for a success element
-        )
-        print("Video uploaded successfully!")
+        # Selenium is only imported when the browser fallback is actually used
+        from browser_pool import browser_pool
+        with span("bilibili.browser_upload"), browser_pool.lease() as driver:
+            _upload_with_driver(driver, video_path, title, description, tags)
+        record("bytes_uploaded", os.path.getsize(video_path))
         return True
-
     except Exception as e:
         print(f"An error occurred during Bilibili upload: {e}")
         return False
-    finally:
-        driver.quit()
+
+def _upload_with_driver(driver, video_path, title, description, tags):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.common.keys import Keys
+
+    # Navigate to Bilibili upload page
+    driver.get("https://member.bilibili.com/video/upload.html")
+
+    # Wait for the upload button to be present and clickable
+    upload_button = WebDriverWait(driver, 30).until(
+        EC.presence_of_element_located((By.XPATH, "//input[@type=\"file\"]"))
+    )
+    
+    # Send the video file path to the input element
+    upload_button.send_keys(video_path)
+
+    print(f"Uploading video: {video_path}")
+
+    # Wait for upload to start and progress bar to appear (adjust as needed)
+    WebDriverWait(driver, 120).until(
+        EC.presence_of_element_located((By.CLASS_NAME, "upload-progress-v2"))
+    )
+    print("Video upload started...")
+
+    # Wait for upload to complete (progress bar disappears or success message appears)
+    WebDriverWait(driver, 600).until(
+        EC.invisibility_of_element_located((By.CLASS_NAME, "upload-progress-v2"))
+    )
+    print("Video upload completed.")
+
+    # Fill in video title
+    title_input = WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.CLASS_NAME, "video-title-input"))
+    )
+    title_input.clear()
+    title_input.send_keys(title)
+    print(f"Set title: {title}")
+
+    # Fill in video description
+    description_textarea = driver.find_element(By.CLASS_NAME, "description-textarea")
+    description_textarea.clear()
+    description_textarea.send_keys(description)
+    print(f"Set description: {description}")
+
+    # Add tags (this part might need adjustment based on Bilibili's UI)
+    # Bilibili's tag input is dynamic, so we might need to simulate typing and selecting
+    tag_input = driver.find_element(By.CLASS_NAME, "tag-input")
+    for tag in tags:
+        tag_input.send_keys(tag)
+        tag_input.send_keys(Keys.ENTER) # Simulate pressing Enter after each tag
+        time.sleep(0.5) # Small delay
+    print(f"Set tags: {', '.join(tags)}")
+
+    # Click the submit button (this XPath might need to be more specific)
+    submit_button = driver.find_element(By.XPATH, "//div[contains(@class, 'submit-btn') and text()='立即投稿']")
+    submit_button.click()
+    print("Clicked submit button.")
+
+    # Wait for success message or redirection
+    WebDriverWait(driver, 30).until(
+        EC.url_contains("member.bilibili.com/video/submission") # Or check for a success element
+    )
+    print("Video uploaded successfully!")
+    return True
 
 if __name__ == '__main__':
     # Example usage:
@@ -1,9 +1,91 @@
-import pysrt
+import heapq
+import math
+from collections import deque
+from subtitles import iter_cues, SrtWriter
+from metrics import record
+
+def align_cues(original_cues, translated_cues):
+    """
+    Aligns two time-sorted cue streams by time overlap, in a single pass.
+
+    Each translated cue is attached to the original cue it overlaps the most; on equal
+    overlap the original that starts first (or comes first in the stream) wins. So
+    translations split or merged differently from the original are combined onto the
+    right original cue. Translated cues that overlap no original cue are kept as cues
+    of their own.
+
+    Only originals that can still overlap a later translation are compared, kept in a
+    heap by end time, so each original is scanned once per translation it overlaps, even
+    while a long cue holds back the output of the cues after it.
+
+    Args:
+        original_cues (iterable): Cue objects sorted by start time.
+        translated_cues (iterable): Cue objects sorted by start time.
+
+    Yields:
+        tuple: (start_ms, end_ms, original_text, translated_text) in start time order,
+            where either text may be empty.
+    """
+    originals = iter(original_cues)
+    next_original = next(originals, None)
+    # Cues not emitted yet, each sorted by start: [start, end, original_text, translated_texts].
+    # Translated cues overlapping no original are kept apart, so both stay in start order.
+    pending_originals = deque()
+    pending_translations = deque()
+    # Originals that can still overlap a later translation: (end, stream index, cue)
+    active = []
+    index = 0
+
+    for translated in translated_cues:
+        t_start, t_end, t_text = translated.start, translated.end, translated.text
+        # Originals ending before this translation starts cannot overlap any later one
+        while active and active[0][0] <= t_start:
+            heapq.heappop(active)
+        yield from _pop_ended(pending_originals, pending_translations, t_start)
+        while next_original is not None and next_original.start < t_end:
+            cue = [next_original.start, next_original.end, next_original.text, []]
+            pending_originals.append(cue)
+            heapq.heappush(active, (cue[1], index, cue))
+            index += 1
+            next_original = next(originals, None)
+
+        best = None
+        for _, cue_index, cue in active:
+            overlap = min(cue[1], t_end) - max(cue[0], t_start)
+            if overlap > 0 and (best is None or (-overlap, cue_index) < best[0]):
+                best = (-overlap, cue_index), cue
+        if best is not None:
+            best[1][3].append(t_text)
+        else:
+            pending_translations.append([t_start, t_end, None, [t_text]])
+
+    yield from _pop_ended(pending_originals, pending_translations, math.inf)
+    while next_original is not None:
+        yield next_original.start, next_original.end, next_original.text, ""
+        next_original = next(originals, None)
+
+def _pop_ended(pending_originals, pending_translations, time_ms):
+    # Emits pending cues in start order, up to the first one still running at time_ms
+    while pending_originals or pending_translations:
+        if not pending_translations or (pending_originals and pending_originals[0][0] <= pending_translations[0][0]):
+            pending = pending_originals
+        else:
+            pending = pending_translations
+        if pending[0][1] > time_ms:
+            return
+        yield _emit(pending.popleft())
+
+def _emit(cue):
+    start, end, original_text, translated_texts = cue
+    return start, end, original_text or "", "\n".join(translated_texts)
 
 def merge_subtitles(original_srt_path, translated_srt_path, output_srt_path):
     """
     Merges two SRT subtitle files into a single bilingual SRT file.
 
+    Cues are paired by time overlap rather than by index, so the files may have
+    different numbers of cues. Both files are streamed, never loaded whole.
+
     Args:
         original_srt_path (str): The path to the original language SRT file.
         translated_srt_path (str): The path to the translated language SRT file.
@@ -13,28 +95,12 @@ def merge_subtitles(original_srt_path, translated_srt_path, output_srt_path):
         str: The path to the merged SRT file if successful, None otherwise.
     """
     try:
-        original_subs = pysrt.open(original_srt_path, encoding="utf-8")
-        translated_subs = pysrt.open(translated_srt_path, encoding="utf-8")
-
-        merged_subs = pysrt.SubRipFile()
-
-        # Assuming both SRT files have the same number of subtitles and are aligned
-        for i in range(len(original_subs)):
-            original_text = original_subs[i].text
-            translated_text = translated_subs[i].text
-            
-            # Merge the texts with a newline in between
-            merged_text = f"{original_text}\n{translated_text}"
-            
-            new_sub = pysrt.SubRipItem(
-                index=original_subs[i].index,
-                start=original_subs[i].start,
-                end=original_subs[i].end,
-                text=merged_text
-            )
-            merged_subs.append(new_sub)
-        
-        merged_subs.save(output_srt_path, encoding="utf-8")
+        with SrtWriter(output_srt_path) as writer:
+            for start, end, original_text, translated_text in align_cues(iter_cues(original_srt_path), iter_cues(translated_srt_path)):
+                # Merge the texts with a newline in between
+                writer.write(start, end, "\n".join(text for text in (original_text, translated_text) if text))
+            record("cues_merged", writer.count)
+
         print("Bilingual subtitle merging successful!")
         return output_srt_path
     except Exception as e:
@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from bilibili_api_uploader import COOKIES_FILE
+from metrics import process_tree_rss
+
+CHROMEDRIVER_PATH = os.environ.get("CHROMEDRIVER_PATH", "/usr/bin/chromedriver")
+BROWSER_POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", "2"))
+BROWSER_PROFILE_DIR = os.environ.get("BROWSER_PROFILE_DIR", "./browser_profiles")
+# Recycle a driver after this many uploads or once Chrome uses more memory than this
+MAX_UPLOADS_PER_DRIVER = int(os.environ.get("BROWSER_MAX_UPLOADS", "20"))
+MAX_DRIVER_MEMORY_MB = int(os.environ.get("BROWSER_MAX_MEMORY_MB", "1500"))
+BILIBILI_URL = "https://www.bilibili.com"
+
+
+class _PooledDriver:
+    def __init__(self, driver, profile_dir):
+        self.driver = driver
+        self.profile_dir = profile_dir
+        self.uploads = 0
+
+    def memory_usage(self):
+        return process_tree_rss(self.driver.service.process.pid)
+
+
+class BrowserPool:
+    """
+    Pool of long-lived Chrome WebDrivers leased to concurrent upload jobs.
+
+    Each pool slot keeps its own Chrome profile directory, so a login survives driver
+    restarts, and the session cookies are also saved to the cookies file after each
+    upload. Drivers are started lazily, health-checked before they are handed out,
+    and recycled after max_uploads uploads or when Chrome grows past max_memory_mb.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, profile_dir=BROWSER_PROFILE_DIR, max_uploads=MAX_UPLOADS_PER_DRIVER,
+                 max_memory_mb=MAX_DRIVER_MEMORY_MB, cookies_file=COOKIES_FILE):
+        self.profile_dir = profile_dir
+        self.max_uploads = max_uploads
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024
+        self.cookies_file = cookies_file
+        self._slots = list(range(size))  # free profile slots
+        self._idle = {}  # slot -> _PooledDriver
+        self._available = threading.Condition()
+        self._cookies_lock = threading.Lock()
+
+    @contextmanager
+    def lease(self):
+        """
+        Leases a logged-in driver, waiting for one if all are in use.
+
+        Yields:
+            selenium.webdriver.Chrome: The driver, which is returned to the pool when the
+            block exits. A driver whose block raised is quit instead.
+        """
+        slot, pooled = self._acquire()
+        try:
+            if pooled is None or not self._is_healthy(pooled):
+                if pooled is not None:
+                    self._quit(pooled)
+                pooled = self._start_driver(slot)
+            yield pooled.driver
+        except Exception:
+            self._quit(pooled)
+            self._release(slot, None)
+            raise
+        # The upload succeeded; bookkeeping errors must not make it look failed
+        try:
+            pooled.uploads += 1
+            self._save_cookies(pooled.driver)
+            if pooled.uploads >= self.max_uploads or pooled.memory_usage() > self.max_memory_bytes:
+                print(f"Recycling browser {slot} after {pooled.uploads} uploads")
+                self._quit(pooled)
+                pooled = None
+        except Exception as e:
+            print(f"Recycling browser {slot} after an error: {e}")
+            self._quit(pooled)
+            pooled = None
+        finally:
+            self._release(slot, pooled)
+
+    def _acquire(self):
+        with self._available:
+            while not self._slots:
+                self._available.wait()
+            slot = self._slots.pop()
+            return slot, self._idle.pop(slot, None)
+
+    def _release(self, slot, pooled):
+        with self._available:
+            if pooled is not None:
+                self._idle[slot] = pooled
+            self._slots.append(slot)
+            self._available.notify()
+
+    def _start_driver(self, slot):
+        profile_dir = os.path.abspath(os.path.join(self.profile_dir, f"profile-{slot}"))
+        os.makedirs(profile_dir, exist_ok=True)
+        service = Service(executable_path=CHROMEDRIVER_PATH)
+        options = webdriver.ChromeOptions()
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--headless")  # Run in headless mode
+        options.add_argument(f"--user-data-dir={profile_dir}")
+        print(f"Starting browser {slot}...")
+        driver = webdriver.Chrome(service=service, options=options)
+        self._restore_cookies(driver)
+        return _PooledDriver(driver, profile_dir)
+
+    def _is_healthy(self, pooled):
+        try:
+            return pooled.driver.execute_script("return 1") == 1 and pooled.memory_usage() <= self.max_memory_bytes
+        except Exception:
+            return False
+
+    def _restore_cookies(self, driver):
+        # The profile usually still holds the login; the cookies file covers a fresh profile
+        if not os.path.exists(self.cookies_file):
+            return
+        with open(self.cookies_file, "r", encoding="utf-8") as f:
+            cookies = json.load(f)
+        if isinstance(cookies, dict):
+            cookies = [{"name": name, "value": value} for name, value in cookies.items()]
+        driver.get(BILIBILI_URL)
+        for cookie in cookies:
+            try:
+                driver.add_cookie({
+                    "name": cookie["name"],
+                    "value": cookie["value"],
+                    "domain": cookie.get("domain", ".bilibili.com"),
+                    "path": cookie.get("path", "/"),
+                })
+            except Exception as e:
+                print(f"Could not restore cookie {cookie['name']}: {e}")
+
+    def _save_cookies(self, driver):
+        try:
+            cookies = [cookie for cookie in driver.get_cookies() if "bilibili.com" in cookie.get("domain", "")]
+        except Exception:
+            return
+        # Only keep cookies of a logged-in session
+        if not any(cookie["name"] == "SESSDATA" for cookie in cookies):
+            return
+        tmp_path = f"{self.cookies_file}.tmp"
+        with self._cookies_lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(cookies, f)
+            os.replace(tmp_path, self.cookies_file)
+
+    @staticmethod
+    def _quit(pooled):
+        if pooled is None:
+            return
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        """
+        Quits all idle drivers.
+        """
+        with self._available:
+            idle = list(self._idle.values())
+            self._idle.clear()
+        for pooled in idle:
+            self._quit(pooled)
+
+
+# Shared pool used by the Selenium uploader
+browser_pool = BrowserPool()
@@ -1,106 +1,207 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+import json
 import os
 import threading
-from main_agent import YouTubeToBilibiliAgent
+from job_queue import JobManager
+from transcription_engines import ENGINES
+from youtube_downloader import extract_video_id
+import metrics
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Global variable to store processing status
-processing_status = {
-    "is_processing": False,
-    "current_step": 0,
-    "progress": 0,
-    "result": None,
-    "error": None
+# Default transcription model, engine (TRANSCRIBE_ENGINE, see transcription_engines) and
+# compute type; models are kept loaded between jobs by the model registry
+WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "base")
+TRANSCRIBE_COMPUTE_TYPE = os.environ.get("TRANSCRIBE_COMPUTE_TYPE") or None
+
+# Split long audio at silence and transcribe it on this many processes (0 disables chunking)
+TRANSCRIBE_CHUNK_WORKERS = int(os.environ.get("TRANSCRIBE_CHUNK_WORKERS", "0"))
+
+# Read and transcribe audio one window at a time, so multi-hour videos use bounded memory
+TRANSCRIBE_WINDOWED = os.environ.get("TRANSCRIBE_WINDOWED", "0") == "1"
+
+# Options of the agent that runs the jobs
+AGENT_OPTIONS = {
+    "whisper_model": WHISPER_MODEL,
+    "compute_type": TRANSCRIBE_COMPUTE_TYPE,
+    # "soft" adds the bilingual subtitles as a track, "burn" renders them into the video
+    "subtitle_mode": os.environ.get("SUBTITLE_MODE", "soft"),
+    # Start transcribing from the audio stream while the video stream downloads
+    "audio_first": os.environ.get("AUDIO_FIRST_DOWNLOAD", "0") == "1",
+    # Translate subtitles while transcription is running
+    "streaming": os.environ.get("STREAMING_SUBTITLES", "0") == "1",
+    # Write per-job timing profiles as JSON into this directory
+    "profile_dir": os.environ.get("JOB_PROFILE_DIR") or None,
+    "transcription_options": {
+        "chunked": TRANSCRIBE_CHUNK_WORKERS > 0,
+        "workers": TRANSCRIBE_CHUNK_WORKERS or None,
+        "windowed": TRANSCRIBE_WINDOWED
+    }
 }
 
-def process_video_async(youtube_url, video_title, video_description, video_tags):
+# Queue of processing jobs, each stage running on its own worker pool. Created on first
+# use, since it creates the work directory and starts threads.
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+def get_job_manager():
     """
-    Asynchronous video processing function
+    Returns the API's job manager, creating it on first use
     """
-    global processing_status
-    
-    try:
-        processing_status["is_processing"] = True
-        processing_status["current_step"] = 0
-        processing_status["progress"] = 0
-        processing_status["result"] = None
-        processing_status["error"] = None
-        
-        # Initialize agent
-        agent = YouTubeToBilibiliAgent()
-        
-        # Process video with step-by-step updates
-        steps = [
-            "下载YouTube视频",
-            "提取音频",
-            "生成字幕",
-            "翻译字幕",
-            "合并双语字幕",
-            "上传到B站"
-        ]
-        
-        for i, step in enumerate(steps):
-            processing_status["current_step"] = i
-            processing_status["progress"] = (i / len(steps)) * 100
-            
-            # Simulate processing time for each step
-            # In real implementation, you would call the actual functions here
-            import time
-            time.sleep(2)  # Simulate processing time
-        
-        # Call the actual agent processing
-        result = agent.process_video(
-            youtube_url, 
-            video_title or "从YouTube转载的视频", 
-            video_description or "这是一个从YouTube转载并添加了双语字幕的视频。", 
-            video_tags.split(',') if video_tags else ["转载", "双语字幕", "YouTube"]
-        )
-        
-        processing_status["result"] = result
-        processing_status["progress"] = 100
-        
-    except Exception as e:
-        processing_status["error"] = str(e)
-    finally:
-        processing_status["is_processing"] = False
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager(agent_options=AGENT_OPTIONS)
+        return _job_manager
 
 @app.route('/api/process', methods=['POST'])
 def process_video():
     """
-    Start video processing
+    Queue a video for processing
     """
-    global processing_status
-    
-    if processing_status["is_processing"]:
-        return jsonify({"error": "已有视频正在处理中，请稍后再试"}), 400
-    
     data = request.json
     youtube_url = data.get('youtube_url')
     video_title = data.get('video_title', '')
     video_description = data.get('video_description', '')
     video_tags = data.get('video_tags', '')
-    
+    # Optional per-job transcription settings, defaults from the environment
+    transcription = {
+        "engine": data.get('transcription_engine'),
+        "model": data.get('whisper_model'),
+        "compute_type": data.get('compute_type')
+    }
+
     if not youtube_url:
         return jsonify({"error": "YouTube链接不能为空"}), 400
-    
-    # Start processing in a separate thread
-    thread = threading.Thread(
-        target=process_video_async,
-        args=(youtube_url, video_title, video_description, video_tags)
-    )
-    thread.start()
-    
-    return jsonify({"message": "视频处理已开始"})
 
-@app.route('/api/status', methods=['GET'])
-def get_status():
+    try:
+        job = get_job_manager().submit(
+            youtube_url,
+            video_title or "从YouTube转载的视频",
+            video_description or "这是一个从YouTube转载并添加了双语字幕的视频。",
+            video_tags.split(',') if video_tags else ["转载", "双语字幕", "YouTube"],
+            transcription=transcription
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"message": "视频处理已加入队列", "job_id": job.id}), 202
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """
+    List all jobs
+    """
+    return jsonify([job.to_dict() for job in get_job_manager().list()])
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Get the processing status of a job
+    """
+    job = get_job_manager().get(job_id)
+    if not job:
+        return jsonify({"error": "任务不存在"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Stream the progress events of a job as Server-Sent Events
+    """
+    job = get_job_manager().get(job_id)
+    if not job:
+        return jsonify({"error": "任务不存在"}), 404
+
+    # EventSource sends the last received id when it reconnects
+    last_event_id = request.headers.get('Last-Event-ID')
+    after = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+
+    def stream():
+        nonlocal after
+        while True:
+            events = job.wait_events(after, timeout=15)
+            if not events:
+                # Only close once job_finish has been sent, not as soon as the status is terminal
+                if job.has_finish_event:
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                yield f"id: {event['id']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            after = events[-1]["id"] + 1
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/jobs/<job_id>/subtitles', methods=['GET'])
+def get_job_subtitles(job_id):
+    """
+    Get the bilingual subtitles of a job, including a partial preview while it is running
+    """
+    job = get_job_manager().get(job_id)
+    if not job:
+        return jsonify({"error": "任务不存在"}), 404
+
+    srt_path = job.state["result"]["bilingual_srt"] or job.state.get("preview_srt")
+    if not srt_path or not os.path.exists(srt_path):
+        return jsonify({"error": "字幕尚未生成"}), 404
+    with open(srt_path, "r", encoding="utf-8") as f:
+        return Response(f.read(), mimetype='text/plain; charset=utf-8')
+
+@app.route('/api/jobs/<job_id>/profile', methods=['GET'])
+def get_job_profile(job_id):
+    """
+    Get the timing spans of a job's finished stages
+    """
+    job = get_job_manager().get(job_id)
+    if not job:
+        return jsonify({"error": "任务不存在"}), 404
+    return jsonify(job.state["profile"])
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Stage timings, resource usage and throughput counters in the Prometheus text format
+    """
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/videos', methods=['GET'])
+def list_videos():
+    """
+    List processed videos, optionally only those uploaded to Bilibili (?uploaded=1)
+    """
+    uploaded_only = request.args.get('uploaded') == '1'
+    return jsonify(get_job_manager().agent.video_index.list(uploaded_only))
+
+@app.route('/api/videos/<video>', methods=['DELETE'])
+def purge_video(video):
     """
-    Get current processing status
+    Remove a video from the processed-video index so it can be processed again
     """
-    return jsonify(processing_status)
+    video_id = extract_video_id(video) or video
+    if not get_job_manager().agent.purge_videos([video_id]):
+        return jsonify({"error": "视频不存在"}), 404
+    return jsonify({"message": "已删除", "video_id": video_id})
+
+@app.route('/api/transcription/engines', methods=['GET'])
+def list_transcription_engines():
+    """
+    List the transcription engines, whether they are installed, and the default settings
+    """
+    agent = get_job_manager().agent
+    return jsonify({
+        "engines": [engine.describe() for engine in ENGINES.values()],
+        "default": {
+            "engine": agent.transcription_engine,
+            "model": agent.whisper_model,
+            "compute_type": agent.compute_type or ENGINES[agent.transcription_engine].default_compute_type
+        }
+    })
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -118,12 +219,26 @@ def index():
         "name": "YouTube到B站智能体API",
         "version": "1.0.0",
         "endpoints": {
-            "/api/process": "POST - 开始视频处理",
-            "/api/status": "GET - 获取处理状态",
+            "/api/process": "POST - 提交视频处理任务",
+            "/api/jobs": "GET - 获取任务列表",
+            "/api/jobs/<id>": "GET - 获取任务状态",
+            "/api/jobs/<id>/events": "GET - 任务进度事件流 (SSE)",
+            "/api/jobs/<id>/subtitles": "GET - 获取双语字幕 (处理中返回预览)",
+            "/api/jobs/<id>/profile": "GET - 任务各阶段的耗时和资源使用",
+            "/api/metrics": "GET - Prometheus 指标",
+            "/api/videos": "GET - 已处理的视频列表",
+            "/api/videos/<id>": "DELETE - 从已处理索引中删除视频",
+            "/api/transcription/engines": "GET - 可用的转录引擎和默认设置",
             "/api/health": "GET - 健康检查"
         }
     })
 
 if __name__ == '__main__':
+    # Load the default transcription model once at startup so the first job does not pay for it.
+    # With debug=True only the reloader child process serves requests.
+    if os.environ.get("WHISPER_PRELOAD", "1") == "1" and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        threading.Thread(
+            target=get_job_manager().agent.warm_up,
+            daemon=True
+        ).start()
     app.run(host='0.0.0.0', port=5000, debug=True)
-
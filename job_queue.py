@@ -0,0 +1,276 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from main_agent import YouTubeToBilibiliAgent, STAGES
+
+# Stages are grouped into pools by the resource they are bound by. Each pool has
+# its own bounded number of workers, so a slow transcription does not hold up
+# downloads or uploads of other jobs.
+STAGE_POOLS = [
+    ("download", ["download"]),
+    ("transcribe", ["extract_audio", "transcribe"]),
+    ("translate", ["translate", "merge"]),
+    ("mux", ["mux"]),
+    ("upload", ["upload"]),
+]
+
+DEFAULT_POOL_SIZES = {
+    "download": int(os.environ.get("DOWNLOAD_WORKERS", "3")),
+    # Each transcription worker holds its own Whisper model in memory
+    "transcribe": int(os.environ.get("TRANSCRIBE_WORKERS", str(max(1, (os.cpu_count() or 1) // 4)))),
+    "translate": int(os.environ.get("TRANSLATE_WORKERS", "4")),
+    # Burning in subtitles already encodes on all cores
+    "mux": int(os.environ.get("MUX_WORKERS", "1")),
+    "upload": int(os.environ.get("UPLOAD_WORKERS", "2")),
+}
+
+STAGE_NAMES = [stage for stage, _ in STAGES]
+
+# Finished jobs kept with their state and events; older ones are forgotten as new jobs arrive
+MAX_FINISHED_JOBS = int(os.environ.get("MAX_FINISHED_JOBS", "200"))
+
+
+class Job:
+    """
+    A single video processing job and its status.
+    """
+
+    def __init__(self, agent, state):
+        self.id = state["job_id"]
+        self.agent = agent
+        self.state = state  # Job state passed through the agent's stages
+        self.status = "queued"  # queued, running, completed, failed
+        self.current_step = 0
+        self.progress = 0
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.events = []
+        self._events_changed = threading.Condition()
+
+    @property
+    def is_finished(self):
+        return self.status in ("completed", "failed")
+
+    @property
+    def has_finish_event(self):
+        # job_finish is the last event of a job; the status can become terminal before it is added
+        return bool(self.events) and self.events[-1]["type"] == "job_finish"
+
+    def add_event(self, event):
+        """
+        Records a progress event and updates the job status from it.
+
+        Events from the agent (see YouTubeToBilibiliAgent.run_stage) move the current
+        step and progress; job-level events are added for status changes.
+        """
+        with self._events_changed:
+            if event.get("stage") in STAGE_NAMES:
+                self.current_step = STAGE_NAMES.index(event["stage"])
+                fraction = {"stage_finish": 1, "stage_progress": event.get("progress", 0)}.get(event["type"], 0)
+                self.progress = (self.current_step + fraction) / len(STAGE_NAMES) * 100
+            if event["type"] == "job_finish" and self.status == "completed":
+                self.progress = 100
+            event = dict(
+                event,
+                id=len(self.events),
+                time=time.time(),
+                status=self.status,
+                current_step=self.current_step,
+                progress=self.progress
+            )
+            if event["type"] == "job_finish":
+                event["result"] = self.state["result"]
+                event["error"] = self.error
+            self.events.append(event)
+            self._events_changed.notify_all()
+
+    def finish(self, status, error=None):
+        """
+        Moves the job to its terminal status and records the job_finish event in one step,
+        so anyone who sees the status also finds the event.
+        """
+        with self._events_changed:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+            self.add_event({"type": "job_finish"})
+
+    def wait_events(self, after, timeout=None):
+        """
+        Returns events with an id of at least after, waiting up to timeout seconds for new ones.
+        """
+        with self._events_changed:
+            if len(self.events) <= after and not self.has_finish_event:
+                self._events_changed.wait(timeout)
+            return self.events[after:]
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "youtube_url": self.state["youtube_url"],
+            "status": self.status,
+            "is_processing": self.status in ("queued", "running"),
+            "current_step": self.current_step,
+            "current_stage": STAGE_NAMES[self.current_step],
+            "progress": self.progress,
+            "transcription": self.state["transcription"],
+            "result": self.state["result"] if self.is_finished else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Queues video processing jobs and runs their stages on per-stage worker pools.
+    """
+
+    def __init__(self, work_dir="./work", pool_sizes=None, agent_options=None, max_finished_jobs=MAX_FINISHED_JOBS):
+        # Jobs share one agent; each job gets its own work directory from agent.new_job
+        self.agent = YouTubeToBilibiliAgent(work_dir=work_dir, **(agent_options or {}))
+        sizes = dict(DEFAULT_POOL_SIZES, **(pool_sizes or {}))
+        self.pools = {
+            name: ThreadPoolExecutor(max_workers=max(1, sizes[name]), thread_name_prefix=f"{name}-worker")
+            for name, _ in STAGE_POOLS
+        }
+        self.jobs = {}
+        self.max_finished_jobs = max_finished_jobs
+        self._lock = threading.Lock()
+
+    def submit(self, youtube_url, video_title, video_description, video_tags, target_language="zh-CN",
+               transcription=None):
+        """
+        Queues a new job.
+
+        Args:
+            transcription (dict): Optional transcription settings for this job, see YouTubeToBilibiliAgent.new_job
+
+        Returns:
+            Job: The created job
+
+        Raises:
+            ValueError: If the transcription settings are not supported
+        """
+        state = self.agent.new_job(youtube_url, video_title, video_description, video_tags, target_language,
+                                   transcription)
+        job = Job(self.agent, state)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._prune()
+        job.add_event({"type": "job_queued"})
+        self._schedule(job, 0)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self.jobs.values())
+
+    def _prune(self):
+        # Called with self._lock held: forgets the oldest finished jobs beyond max_finished_jobs
+        finished = sorted((job for job in self.jobs.values() if job.is_finished), key=lambda job: job.finished_at)
+        for job in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job.id]
+
+    def _schedule(self, job, pool_index):
+        name, _ = STAGE_POOLS[pool_index]
+        self.pools[name].submit(self._run_pool_stages, job, pool_index)
+
+    def _run_pool_stages(self, job, pool_index):
+        _, stages = STAGE_POOLS[pool_index]
+        try:
+            job.status = "running"
+            for stage in stages:
+                print(f"[{job.id}] {dict(STAGES)[stage]}...")
+                job.agent.run_stage(stage, job.state, job.add_event)
+        except Exception as e:
+            job.state["result"]["error"] = str(e)
+            self._finish_job(job)
+            job.finish("failed", str(e))
+            print(f"[{job.id}] 处理失败: {e}")
+            return
+
+        if pool_index + 1 < len(STAGE_POOLS):
+            # Wait in the next stage's queue
+            job.status = "queued"
+            self._schedule(job, pool_index + 1)
+        else:
+            job.state["result"]["success"] = True
+            self._finish_job(job)
+            job.finish("completed")
+            print(f"[{job.id}] 处理完成")
+
+    def _finish_job(self, job):
+        # Runs before the job becomes terminal, so its cleanup and profile are done once
+        # clients see it finish; a failure here must not leave the job running forever
+        try:
+            self.agent.finish_job(job.state)
+        except Exception as e:
+            print(f"[{job.id}] 任务清理失败: {e}")
+
+    def wait(self, jobs=None, timeout=None):
+        """
+        Waits until the given jobs (all jobs by default) are finished.
+
+        Returns:
+            bool: True if all jobs finished, False if the timeout expired first.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for job in jobs if jobs is not None else self.list():
+            while not job.has_finish_event:
+                remaining = deadline - time.monotonic() if deadline is not None else 1
+                if remaining <= 0:
+                    return False
+                job.wait_events(len(job.events), timeout=min(remaining, 1))
+        return True
+
+    def shutdown(self, wait=True):
+        for pool in self.pools.values():
+            pool.shutdown(wait=wait)
+
+
+def throughput_report(jobs, wall_seconds):
+    """
+    Aggregates the stage timings of finished jobs.
+
+    Returns:
+        dict: Job counts (including videos skipped as already uploaded), videos per hour and, per stage, how many jobs ran it, how many
+        were skipped from the manifest, and the total and mean seconds spent in it.
+    """
+    stages = {stage: {"runs": 0, "cached": 0, "seconds": 0.0} for stage in STAGE_NAMES}
+    downloaded_bytes = 0
+    for job in jobs:
+        started = {}
+        for event in job.events:
+            stage = stages.get(event.get("stage"))
+            if stage is None:
+                continue
+            if event["type"] == "stage_start":
+                started[event["stage"]] = event["time"]
+            elif event["type"] == "stage_finish":
+                stage["runs"] += 1
+                stage["cached"] += 1 if event.get("cached") else 0
+                stage["seconds"] += event["time"] - started.pop(event["stage"], event["time"])
+        download_events = [event for event in job.events if event.get("downloaded_bytes") is not None]
+        if download_events:
+            downloaded_bytes += download_events[-1]["downloaded_bytes"]
+    for stage in stages.values():
+        stage["mean_seconds"] = stage["seconds"] / stage["runs"] if stage["runs"] else 0
+
+    completed = sum(1 for job in jobs if job.status == "completed")
+    return {
+        "jobs": len(jobs),
+        "completed": completed,
+        "failed": sum(1 for job in jobs if job.status == "failed"),
+        "skipped": sum(1 for job in jobs if job.state["result"]["skipped"]),
+        "wall_seconds": wall_seconds,
+        "videos_per_hour": completed / wall_seconds * 3600 if wall_seconds else 0,
+        "downloaded_bytes": downloaded_bytes,
+        "stages": stages,
+    }
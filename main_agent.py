@@ -1,18 +1,485 @@
+import argparse
+import hashlib
+import json
 import os
-import sys
-from youtube_downloader import download_youtube_video
-from audio_extractor import extract_audio
-from subtitle_generator import generate_subtitles
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from youtube_downloader import (
+    download_youtube_video, download_audio_stream, download_video_stream, merge_streams, extract_video_id,
+    expand_urls
+)
 from subtitle_translator import translate_subtitle
+from translation_cache import get_default_cache
+from transcription_cache import get_default_cache as get_default_transcription_cache
 from bilingual_subtitle_merger import merge_subtitles
-from bilibili_uploader import upload_video_to_bilibili
+from stage_manifest import StageManifest, file_sha256, stage_key
+from work_janitor import DEFAULT_DISK_BUDGET_GB, enforce_disk_budget, mark_finished, touch
+from video_index import VideoIndex
+from metrics import span
+from transcription_engines import ENGINES, get_engine, transcription_model
+
+# Stage backends that pull in heavy libraries (numpy, Whisper/torch, Selenium) are
+# imported in the stage methods on first use, so importing this module stays cheap.
+
+# Pipeline stages in execution order, with their display names
+STAGES = [
+    ("download", "下载YouTube视频"),
+    ("extract_audio", "提取音频"),
+    ("transcribe", "生成字幕"),
+    ("translate", "翻译字幕"),
+    ("merge", "合并双语字幕"),
+    ("mux", "合成字幕视频"),
+    ("upload", "上传到B站"),
+]
+
+# Ways to add the bilingual subtitles to the uploaded video, see YouTubeToBilibiliAgent
+SUBTITLE_MODES = ("soft", "burn", "none")
+
+# Result fields each stage reads from earlier stages and the fields it produces.
+# Input files are identified by content hash in the stage's manifest key.
+STAGE_INPUTS = {
+    "download": [],
+    # Audio-first mode only: fetch the video stream and merge it with the audio stream
+    "fetch_video": ["source_audio_path"],
+    "extract_audio": ["video_path"],
+    "transcribe": ["audio_path"],
+    "translate": ["original_srt"],
+    "merge": ["original_srt", "translated_srt"],
+    "mux": ["video_path", "bilingual_srt"],
+    "upload": ["upload_video_path"],
+}
+STAGE_OUTPUTS = {
+    "download": ["video_path"],
+    "fetch_video": ["video_path"],
+    "extract_audio": ["audio_path"],
+    "transcribe": ["original_srt"],
+    "translate": ["translated_srt"],
+    "merge": ["bilingual_srt"],
+    "mux": ["upload_video_path"],
+    "upload": ["upload_success", "bilibili_submission"],
+}
 
 class YouTubeToBilibiliAgent:
-    def __init__(self, work_dir="./work"):
+    def __init__(self, work_dir="./work", whisper_model="base", whisper_device=None, audio_format="pcm",
+                 transcription_options=None, resume=True, force_stages=None, manifest_dir=None,
+                 disk_budget_gb=DEFAULT_DISK_BUDGET_GB, audio_first=False, streaming=False, index_path=None,
+                 skip_uploaded=True, profile_dir=None, translate_client=None, translation_cache=None,
+                 bilibili_uploader=None, transcription_engine=None, compute_type=None, transcription_cache=None,
+                 subtitle_mode="soft", burn_workers=None):
         self.work_dir = work_dir
-        os.makedirs(work_dir, exist_ok=True)
-    
-    def process_video(self, youtube_url, video_title, video_description, video_tags, target_language="zh-CN"):
+        # Default transcription settings; new_job can override them per job
+        self.whisper_model = whisper_model
+        self.whisper_device = whisper_device
+        self.transcription_engine = get_engine(transcription_engine).name
+        self.compute_type = compute_type
+        # Extra generate_subtitles options, e.g. {"chunked": True, "workers": 4}
+        self.transcription_options = transcription_options or {}
+        # "pcm" decodes once to 16 kHz mono for Whisper, "mp3" keeps a compressed audio file
+        self.audio_format = audio_format
+        # Skip stages whose outputs are recorded in the video's manifest, except force_stages
+        self.resume = resume
+        self.force_stages = set(force_stages or [])
+        self.manifest_dir = manifest_dir or os.path.join(work_dir, "manifests")
+        # Each job writes to its own subdirectory of jobs_dir; large files of finished
+        # jobs are evicted when the job directories exceed the disk budget
+        self.jobs_dir = os.path.join(work_dir, "jobs")
+        self.disk_budget_bytes = disk_budget_gb * 1024 ** 3
+        # Download the audio stream first and fetch the video stream in the background,
+        # so transcription overlaps the video download
+        self.audio_first = audio_first
+        # Translate and merge subtitles while transcription is still running
+        self.streaming = streaming
+        # Videos already uploaded to Bilibili are skipped before anything is downloaded
+        self.video_index = VideoIndex(index_path or os.path.join(work_dir, "video_index.sqlite3"))
+        self.skip_uploaded = skip_uploaded
+        # The upload entry of a manifest has no output files to go stale, so reprocessing
+        # has to force the upload or it would be replayed from the manifest
+        if not skip_uploaded:
+            self.force_stages.add("upload")
+        # Optional translation client, translation and transcription caches and BilibiliUploader
+        # replacing the defaults (Google Cloud client, shared on-disk caches, uploader from the cookies file)
+        self.translate_client = translate_client
+        self.translation_cache = translation_cache
+        self.transcription_cache = transcription_cache
+        self.bilibili_uploader = bilibili_uploader
+        # How the bilingual subtitles get into the uploaded video: "soft" adds a subtitle track
+        # without re-encoding, "burn" renders them into the frames, "none" uploads the video as is
+        if subtitle_mode not in SUBTITLE_MODES:
+            raise ValueError(f"Unknown subtitle mode: {subtitle_mode}")
+        self.subtitle_mode = subtitle_mode
+        # Concurrent segment encodes in burn mode, defaults to the number of CPU cores
+        self.burn_workers = burn_workers
+        # Write each job's timing spans to <profile_dir>/<job_id>.json
+        self.profile_dir = profile_dir
+        self._video_downloads = ThreadPoolExecutor(max_workers=2, thread_name_prefix="video-download")
+        os.makedirs(self.jobs_dir, exist_ok=True)
+
+    def purge_videos(self, video_ids=None):
+        """
+        Removes videos from the processed-video index so they are processed and uploaded again,
+        see purge_videos.
+        """
+        return purge_videos(self.video_index, self.manifest_dir, video_ids)
+
+    def warm_up(self):
+        """
+        Loads the default transcription model into the process-local registry ahead of the first job.
+        """
+        with transcription_model(self.transcription_engine, self.whisper_model, self.whisper_device, self.compute_type):
+            pass
+
+    def new_job(self, youtube_url, video_title, video_description, video_tags, target_language="zh-CN",
+                transcription=None):
+        """
+        Creates the state for one video, passed through each stage by run_stage.
+
+        Args:
+            transcription (dict): Optional "engine", "model" and "compute_type" overriding the
+                agent's transcription settings for this job
+
+        Returns:
+            dict: The job inputs and its result dict
+
+        Raises:
+            ValueError: If the engine or compute type is not supported
+        """
+        transcription = self._transcription_settings(transcription or {})
+        video_id = extract_video_id(youtube_url) or hashlib.sha256(youtube_url.encode("utf-8")).hexdigest()[:16]
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        uploaded = self.video_index.get_uploaded(video_id) if self.skip_uploaded else None
+        return {
+            "job_id": job_id,
+            "work_dir": job_dir,
+            "youtube_url": youtube_url,
+            "video_id": video_id,
+            "video_title": video_title,
+            "video_description": video_description,
+            "video_tags": video_tags,
+            "target_language": target_language,
+            "transcription": transcription,
+            # Index entry of an already uploaded video; all stages are skipped
+            "skipped": uploaded,
+            # Content hashes of result files, used in stage manifest keys
+            "hashes": {},
+            # Finished timing spans of the job's stages and their steps, see metrics.span
+            "profile": [],
+            "result": {
+                "success": False,
+                "video_path": None,
+                "source_audio_path": None,
+                "audio_path": None,
+                "original_srt": None,
+                "translated_srt": None,
+                "bilingual_srt": None,
+                "upload_video_path": None,
+                "upload_success": bool(uploaded),
+                "bilibili_submission": uploaded["submission"] if uploaded else None,
+                "skipped": bool(uploaded),
+                "error": None
+            }
+        }
+
+    def _transcription_settings(self, overrides):
+        engine = get_engine(overrides.get("engine") or self.transcription_engine)
+        # The agent's compute type only applies to the agent's engine
+        default_compute_type = self.compute_type if engine.name == self.transcription_engine else None
+        return {
+            "engine": engine.name,
+            "model": overrides.get("model") or self.whisper_model,
+            "compute_type": engine.check_compute_type(overrides.get("compute_type") or default_compute_type),
+        }
+
+    def run_stage(self, stage, job, progress_callback=None):
+        """
+        Runs a single pipeline stage for a job. Raises an exception if the stage fails.
+
+        Progress is reported as event dicts passed to progress_callback, with a "type" of
+        "stage_start", "stage_progress" (with a "progress" fraction between 0 and 1 and
+        stage-specific details such as "downloaded_bytes"),
+        "stage_finish" or "stage_error" (with an "error" message), and the "stage" name.
+
+        Args:
+            stage (str): One of the stage names in STAGES
+            job (dict): Job state created by new_job
+            progress_callback (callable): Optional function receiving progress events
+        """
+        def emit(event_type, **fields):
+            if progress_callback:
+                progress_callback(dict(type=event_type, stage=stage, **fields))
+
+        if job["skipped"]:
+            emit("stage_finish", skipped=True)
+            return
+
+        if stage == "mux" and self.audio_first:
+            # The merged video is only needed now
+            self.run_stage("fetch_video", job, progress_callback)
+
+        with span(stage, collector=job["profile"], job_id=job["job_id"]) as stage_span:
+            self._run_stage(stage, job, emit, stage_span)
+
+    def _run_stage(self, stage, job, emit, stage_span):
+        emit("stage_start")
+        manifest = StageManifest(os.path.join(self.manifest_dir, f"{job['video_id']}.json"))
+        key = stage_key(stage, self._stage_params(stage, job), {
+            field: self._file_hash(job, field) for field in self._stage_inputs(stage)
+        })
+
+        entry = manifest.lookup(stage, key) if self.resume and stage not in self.force_stages else None
+        if entry:
+            for info in entry["files"].values():
+                touch(info["path"])
+            job["result"].update(entry["result"])
+            job["hashes"].update({field: info["sha256"] for field, info in entry["files"].items()})
+            print(f"跳过已完成的阶段 {stage}")
+            stage_span.status = "cached"
+            self._record_index(stage, job)
+            emit("stage_finish", cached=True)
+            return
+
+        try:
+            getattr(self, f"_stage_{stage}")(
+                job, lambda fraction, **details: emit("stage_progress", progress=fraction, **details)
+            )
+        except Exception as e:
+            emit("stage_error", error=str(e))
+            raise
+
+        # A failed upload is not recorded, so the next run retries it
+        if stage != "upload" or job["result"]["upload_success"]:
+            outputs = {field: job["result"][field] for field in self._stage_outputs(stage)}
+            files = {field: value for field, value in outputs.items() if isinstance(value, str)}
+            entry = manifest.record(stage, key, outputs, files)
+            job["hashes"].update({field: info["sha256"] for field, info in entry["files"].items()})
+            self._record_index(stage, job)
+        emit("stage_finish")
+
+    def _record_index(self, stage, job):
+        if stage == "upload":
+            self.video_index.record_submission(job["video_id"], job["youtube_url"], job["result"]["bilibili_submission"])
+        else:
+            self.video_index.record_stage(job["video_id"], job["youtube_url"], stage)
+
+    def _stage_inputs(self, stage):
+        if self.audio_first and stage == "extract_audio":
+            return ["source_audio_path"]
+        return STAGE_INPUTS[stage]
+
+    def _stage_outputs(self, stage):
+        if self.audio_first and stage == "download":
+            return ["source_audio_path"]
+        return STAGE_OUTPUTS[stage]
+
+    def _stage_params(self, stage, job):
+        """
+        Returns the parameters that determine a stage's output, for its manifest key.
+        """
+        if stage in ("download", "fetch_video"):
+            return {"video_id": job["video_id"], "audio_first": self.audio_first}
+        if stage == "extract_audio":
+            return {"audio_format": self.audio_format}
+        if stage == "transcribe":
+            return {**job["transcription"], "options": self.transcription_options, "streaming": self.streaming}
+        if stage == "translate":
+            return {"target_language": job["target_language"]}
+        if stage == "mux":
+            return {"subtitle_mode": self.subtitle_mode}
+        if stage == "upload":
+            return {"title": job["video_title"], "description": job["video_description"], "tags": job["video_tags"]}
+        return {}
+
+    def _file_hash(self, job, field):
+        if field not in job["hashes"]:
+            job["hashes"][field] = file_sha256(job["result"][field])
+        return job["hashes"][field]
+
+    def finish_job(self, job):
+        """
+        Marks a job as finished, evicts old intermediates if the work directory is over budget
+        and writes the job's timing profile if profile_dir is set.
+        """
+        # A job that failed before fetching its video still has the video stream downloading
+        # into its work directory; stop or wait for it before the directory can be evicted
+        pending = job.pop("pending_video", None)
+        if pending and not pending.cancel():
+            try:
+                pending.result()
+            except Exception as e:
+                print(f"后台视频流下载失败: {e}")
+        mark_finished(job["work_dir"])
+        enforce_disk_budget(self.jobs_dir, self.disk_budget_bytes)
+        if self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profile_path = os.path.join(self.profile_dir, f"{job['job_id']}.json")
+            with open(profile_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "job_id": job["job_id"],
+                    "youtube_url": job["youtube_url"],
+                    "video_id": job["video_id"],
+                    "success": job["result"]["success"],
+                    "spans": job["profile"],
+                }, f, ensure_ascii=False, indent=2)
+            print(f"性能剖析已写入: {profile_path}")
+
+    def _stage_download(self, job, report_progress):
+        # Make room before the largest file of the job arrives
+        enforce_disk_budget(self.jobs_dir, self.disk_budget_bytes)
+        progress_callback = lambda downloaded, total: report_progress(
+            downloaded / total if total else 0, downloaded_bytes=downloaded, total_bytes=total
+        )
+
+        if self.audio_first:
+            audio_path = download_audio_stream(job["youtube_url"], job["work_dir"], progress_callback)
+            if not audio_path:
+                raise Exception("音频流下载失败")
+            job["result"]["source_audio_path"] = audio_path
+            job["pending_video"] = self._video_downloads.submit(download_video_stream, job["youtube_url"], job["work_dir"])
+            print(f"音频流下载成功: {audio_path}，视频流在后台下载")
+            return
+
+        video_path = download_youtube_video(job["youtube_url"], job["work_dir"], progress_callback)
+        if not video_path:
+            raise Exception("视频下载失败")
+        job["result"]["video_path"] = video_path
+        print(f"视频下载成功: {video_path}")
+
+    def _stage_fetch_video(self, job, report_progress):
+        pending = job.pop("pending_video", None)
+        # On a resumed run the audio came from the manifest, so nothing is downloading yet
+        video_stream = pending.result() if pending else download_video_stream(job["youtube_url"], job["work_dir"])
+        if not video_stream:
+            raise Exception("视频流下载失败")
+        video_path = merge_streams(video_stream, job["result"]["source_audio_path"], os.path.join(job["work_dir"], "video.mp4"))
+        if not video_path:
+            raise Exception("音视频合并失败")
+        job["result"]["video_path"] = video_path
+        print(f"视频下载成功: {video_path}")
+
+    def _stage_extract_audio(self, job, report_progress):
+        from audio_extractor import extract_audio, extract_audio_pcm
+        source_path = job["result"]["source_audio_path" if self.audio_first else "video_path"]
+        if self.audio_format == "pcm":
+            audio_path = os.path.join(job["work_dir"], "extracted_audio.pcm")
+            extracted_audio = extract_audio_pcm(source_path, audio_path)
+        else:
+            audio_path = os.path.join(job["work_dir"], "extracted_audio.mp3")
+            extracted_audio = extract_audio(source_path, audio_path)
+        if not extracted_audio:
+            raise Exception("音频提取失败")
+        job["result"]["audio_path"] = extracted_audio
+        print(f"音频提取成功: {extracted_audio}")
+
+    def _stage_transcribe(self, job, report_progress):
+        original_srt_path = os.path.join(job["work_dir"], "original_subtitles.srt")
+        if self.streaming:
+            self._stream_subtitles(job, original_srt_path, report_progress)
+            return
+        from subtitle_generator import generate_subtitles
+        settings = job["transcription"]
+        generated_srt = generate_subtitles(
+            job["result"]["audio_path"], original_srt_path, settings["model"], self.whisper_device,
+            engine=settings["engine"], compute_type=settings["compute_type"], cache=self.transcription_cache,
+            fingerprint=self._audio_fingerprint(job), **self.transcription_options
+        )
+        if not generated_srt:
+            raise Exception("字幕生成失败")
+        job["result"]["original_srt"] = generated_srt
+        print(f"字幕生成成功: {generated_srt}")
+
+    def _audio_fingerprint(self, job):
+        # The SHA-256 of a .pcm file, already computed for the manifest, is its audio fingerprint
+        return self._file_hash(job, "audio_path") if self.audio_format == "pcm" else None
+
+    def _stream_subtitles(self, job, original_srt_path, report_progress):
+        translated_srt_path = os.path.join(job["work_dir"], "translated_subtitles.srt")
+        bilingual_srt_path = os.path.join(job["work_dir"], "bilingual_subtitles.srt")
+        # Written incrementally, so it can be previewed while the job is running
+        job["preview_srt"] = bilingual_srt_path
+        from subtitle_pipeline import stream_bilingual_subtitles
+        settings = job["transcription"]
+        cues = stream_bilingual_subtitles(
+            job["result"]["audio_path"], original_srt_path, translated_srt_path, bilingual_srt_path,
+            job["target_language"], settings["model"], self.whisper_device, engine=settings["engine"],
+            compute_type=settings["compute_type"], translate_client=self.translate_client,
+            cache=self.translation_cache or get_default_cache(),
+            transcription_cache=self.transcription_cache or get_default_transcription_cache(),
+            fingerprint=self._audio_fingerprint(job),
+            progress_callback=lambda seconds, total, cues: report_progress(
+                seconds / total if total else 0, audio_seconds=seconds, cues=cues
+            )
+        )
+        job["result"]["original_srt"] = original_srt_path
+        job["result"]["translated_srt"] = translated_srt_path
+        job["result"]["bilingual_srt"] = bilingual_srt_path
+        job["streamed"] = True
+        print(f"字幕生成并翻译成功: {cues} 条字幕")
+
+    def _stage_translate(self, job, report_progress):
+        if job.get("streamed"):
+            print(f"字幕已在转录时翻译: {job['result']['translated_srt']}")
+            return
+        translated_srt_path = os.path.join(job["work_dir"], "translated_subtitles.srt")
+        translated_srt = translate_subtitle(
+            job["result"]["original_srt"], job["target_language"], translated_srt_path,
+            translate_client=self.translate_client, cache=self.translation_cache,
+            progress_callback=lambda done, total: report_progress(done / total)
+        )
+        if not translated_srt:
+            raise Exception("字幕翻译失败")
+        job["result"]["translated_srt"] = translated_srt
+        print(f"字幕翻译成功: {translated_srt}")
+
+    def _stage_merge(self, job, report_progress):
+        if job.get("streamed"):
+            print(f"双语字幕已在转录时合并: {job['result']['bilingual_srt']}")
+            return
+        bilingual_srt_path = os.path.join(job["work_dir"], "bilingual_subtitles.srt")
+        bilingual_srt = merge_subtitles(job["result"]["original_srt"], job["result"]["translated_srt"], bilingual_srt_path)
+        if not bilingual_srt:
+            raise Exception("双语字幕合并失败")
+        job["result"]["bilingual_srt"] = bilingual_srt
+        print(f"双语字幕合并成功: {bilingual_srt}")
+
+    def _stage_mux(self, job, report_progress):
+        video_path, srt_path = job["result"]["video_path"], job["result"]["bilingual_srt"]
+        if self.subtitle_mode == "none":
+            job["result"]["upload_video_path"] = video_path
+            return
+        from subtitle_muxer import mux_soft_subtitles, burn_subtitles
+        output_path = os.path.join(job["work_dir"], f"video.{self.subtitle_mode}.mp4")
+        if self.subtitle_mode == "soft":
+            upload_video_path = mux_soft_subtitles(video_path, srt_path, output_path)
+        else:
+            upload_video_path = burn_subtitles(
+                video_path, srt_path, output_path, self.burn_workers,
+                progress_callback=lambda done, total: report_progress(done / total, segments=done, total_segments=total)
+            )
+        if not upload_video_path:
+            raise Exception("字幕视频合成失败")
+        job["result"]["upload_video_path"] = upload_video_path
+        print(f"字幕视频合成成功: {upload_video_path}")
+
+    def _stage_upload(self, job, report_progress):
+        from bilibili_uploader import upload_video_to_bilibili
+        submission = upload_video_to_bilibili(
+            job["result"]["upload_video_path"], job["video_title"], job["video_description"], job["video_tags"],
+            source_url=job["youtube_url"], uploader=self.bilibili_uploader,
+            progress_callback=lambda uploaded, total: report_progress(
+                uploaded / total if total else 0, uploaded_bytes=uploaded, total_bytes=total
+            )
+        )
+        job["result"]["upload_success"] = submission is not None
+        job["result"]["bilibili_submission"] = submission
+        if submission:
+            print("B站上传成功!")
+        else:
+            print("B站上传失败")
+
+    def process_video(self, youtube_url, video_title, video_description, video_tags, target_language="zh-CN",
+                      progress_callback=None, transcription=None):
         """
         Complete workflow: Download YouTube video, generate bilingual subtitles, and upload to Bilibili.
         
@@ -22,77 +489,24 @@ class YouTubeToBilibiliAgent:
             video_description (str): Description for the Bilibili video
             video_tags (list): Tags for the Bilibili video
             target_language (str): Target language for subtitle translation
+            progress_callback (callable): Optional function receiving stage events, see run_stage
+            transcription (dict): Optional transcription settings for this video, see new_job
             
         Returns:
             dict: Result status and file paths
         """
-        result = {
-            "success": False,
-            "video_path": None,
-            "audio_path": None,
-            "original_srt": None,
-            "translated_srt": None,
-            "bilingual_srt": None,
-            "upload_success": False,
-            "error": None
-        }
+        job = self.new_job(youtube_url, video_title, video_description, video_tags, target_language, transcription)
+        result = job["result"]
         
         try:
             print("=== 开始处理视频 ===")
             print(f"YouTube URL: {youtube_url}")
+            if job["skipped"]:
+                print(f"视频已上传到B站，跳过: {result['bilibili_submission']}")
             
-            # Step 1: Download YouTube video
-            print("\n1. 下载YouTube视频...")
-            video_path = download_youtube_video(youtube_url, self.work_dir)
-            if not video_path:
-                raise Exception("视频下载失败")
-            result["video_path"] = video_path
-            print(f"视频下载成功: {video_path}")
-            
-            # Step 2: Extract audio
-            print("\n2. 提取音频...")
-            audio_path = os.path.join(self.work_dir, "extracted_audio.mp3")
-            extracted_audio = extract_audio(video_path, audio_path)
-            if not extracted_audio:
-                raise Exception("音频提取失败")
-            result["audio_path"] = extracted_audio
-            print(f"音频提取成功: {extracted_audio}")
-            
-            # Step 3: Generate subtitles
-            print("\n3. 生成字幕...")
-            original_srt_path = os.path.join(self.work_dir, "original_subtitles.srt")
-            generated_srt = generate_subtitles(extracted_audio, original_srt_path)
-            if not generated_srt:
-                raise Exception("字幕生成失败")
-            result["original_srt"] = generated_srt
-            print(f"字幕生成成功: {generated_srt}")
-            
-            # Step 4: Translate subtitles
-            print("\n4. 翻译字幕...")
-            translated_srt_path = os.path.join(self.work_dir, "translated_subtitles.srt")
-            translated_srt = translate_subtitle(generated_srt, target_language, translated_srt_path)
-            if not translated_srt:
-                raise Exception("字幕翻译失败")
-            result["translated_srt"] = translated_srt
-            print(f"字幕翻译成功: {translated_srt}")
-            
-            # Step 5: Merge bilingual subtitles
-            print("\n5. 合并双语字幕...")
-            bilingual_srt_path = os.path.join(self.work_dir, "bilingual_subtitles.srt")
-            bilingual_srt = merge_subtitles(generated_srt, translated_srt, bilingual_srt_path)
-            if not bilingual_srt:
-                raise Exception("双语字幕合并失败")
-            result["bilingual_srt"] = bilingual_srt
-            print(f"双语字幕合并成功: {bilingual_srt}")
-            
-            # Step 6: Upload to Bilibili
-            print("\n6. 上传到B站...")
-            upload_success = upload_video_to_bilibili(video_path, video_title, video_description, video_tags)
-            result["upload_success"] = upload_success
-            if upload_success:
-                print("B站上传成功!")
-            else:
-                print("B站上传失败")
+            for i, (stage, label) in enumerate(STAGES):
+                print(f"\n{i + 1}. {label}...")
+                self.run_stage(stage, job, progress_callback)
             
             result["success"] = True
             print("\n=== 处理完成 ===")
@@ -100,30 +514,175 @@ class YouTubeToBilibiliAgent:
         except Exception as e:
             result["error"] = str(e)
             print(f"\n处理失败: {e}")
+        finally:
+            self.finish_job(job)
         
         return result
 
+# Default values (can be customized)
+DEFAULT_VIDEO_TITLE = "从YouTube转载的视频"
+DEFAULT_VIDEO_DESCRIPTION = "这是一个从YouTube转载并添加了双语字幕的视频。"
+DEFAULT_VIDEO_TAGS = ["转载", "双语字幕", "YouTube"]
+
+def purge_videos(video_index, manifest_dir, video_ids=None):
+    """
+    Removes videos from the processed-video index and the upload entries from their stage
+    manifests, so a later run uploads them again. The other stages stay resumable.
+
+    Args:
+        video_index (VideoIndex): The processed-video index.
+        manifest_dir (str): The directory of the per-video stage manifests.
+        video_ids (list): The video IDs to remove, or None for all videos.
+
+    Returns:
+        int: The number of removed index entries.
+    """
+    removed = video_index.purge(video_ids)
+    if video_ids is None:
+        names = os.listdir(manifest_dir) if os.path.isdir(manifest_dir) else []
+        video_ids = [name[:-len(".json")] for name in names if name.endswith(".json")]
+    for video_id in video_ids:
+        manifest_path = os.path.join(manifest_dir, f"{video_id}.json")
+        if os.path.exists(manifest_path):
+            StageManifest(manifest_path).invalidate("upload")
+    return removed
+
+def expand_video_urls(urls):
+    """
+    Expands playlist and channel URLs into their videos. Video URLs are kept as they are,
+    without a metadata request.
+
+    Returns:
+        list: Dicts with the "url" and "title" (None if unknown) of each video.
+    """
+    videos = []
+    for url in urls:
+        if extract_video_id(url):
+            videos.append({"url": url, "title": None})
+        else:
+            print(f"展开链接: {url}")
+            videos.extend(expand_urls(url))
+    return videos
+
+def run_batch(videos, agent_options=None, pool_sizes=None):
+    """
+    Processes many videos through the job queue, each stage with its own concurrency limit.
+
+    Returns:
+        tuple: The throughput report (see job_queue.throughput_report) and the list of jobs
+    """
+    # Imported here because job_queue imports this module
+    from job_queue import JobManager, throughput_report
+
+    manager = JobManager(pool_sizes=pool_sizes, agent_options=agent_options)
+    started = time.monotonic()
+    try:
+        jobs = [
+            manager.submit(video["url"], video["title"] or DEFAULT_VIDEO_TITLE, DEFAULT_VIDEO_DESCRIPTION, DEFAULT_VIDEO_TAGS)
+            for video in videos
+        ]
+        manager.wait(jobs)
+    finally:
+        manager.shutdown()
+    return throughput_report(jobs, time.monotonic() - started), jobs
+
+def _print_report(report, jobs):
+    print("\n=== 批量处理报告 ===")
+    print(f"视频: {report['jobs']}, 成功: {report['completed']}, 失败: {report['failed']}, "
+          f"已上传跳过: {report['skipped']}")
+    print(f"总耗时: {report['wall_seconds']:.1f}s, 吞吐量: {report['videos_per_hour']:.1f} 视频/小时, "
+          f"下载: {report['downloaded_bytes'] / 1024 / 1024:.1f} MB")
+    for stage, label in STAGES:
+        timing = report["stages"][stage]
+        print(f"  {label}: {timing['runs']} 次 (缓存 {timing['cached']}), 共 {timing['seconds']:.1f}s, "
+              f"平均 {timing['mean_seconds']:.1f}s")
+    for job in jobs:
+        if job.status == "failed":
+            print(f"  失败: {job.state['youtube_url']}: {job.error}")
+
 def main():
     """
     Command line interface for the agent
     """
-    if len(sys.argv) < 2:
-        print("使用方法: python main_agent.py <YouTube_URL>")
-        print("示例: python main_agent.py https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+    parser = argparse.ArgumentParser(
+        description="下载YouTube视频，生成双语字幕，并上传到B站",
+        epilog="示例: python main_agent.py https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+    )
+    parser.add_argument("youtube_urls", nargs="*", metavar="youtube_url", help="YouTube视频、播放列表或频道链接")
+    parser.add_argument("--batch-file", help="批量处理的链接文件，每行一个链接 (# 开头为注释)")
+    parser.add_argument("--force-stage", action="append", default=[], choices=[stage for stage, _ in STAGES],
+                        help="重新运行指定阶段，即使已有有效输出 (可重复使用)")
+    parser.add_argument("--no-resume", action="store_true", help="忽略已完成的阶段，从头开始处理")
+    parser.add_argument("--audio-first", action="store_true", help="先下载音频流开始转录，视频流在后台下载")
+    parser.add_argument("--streaming", action="store_true", help="转录的同时翻译并写入双语字幕")
+    parser.add_argument("--engine", choices=list(ENGINES), help="转录引擎 (默认 whisper，faster-whisper 在CPU上使用int8量化)")
+    parser.add_argument("--whisper-model", default="base", help="转录模型名称或本地路径")
+    parser.add_argument("--compute-type", help="转录引擎的计算精度，例如 int8、float32")
+    parser.add_argument("--subtitle-mode", choices=SUBTITLE_MODES, default="soft",
+                        help="字幕加入视频的方式: soft 添加字幕轨 (不重新编码)，burn 烧录到画面，none 不添加")
+    parser.add_argument("--burn-workers", type=int, help="烧录字幕时并行编码的进程数 (默认CPU核数)")
+    parser.add_argument("--windowed", action="store_true", help="逐段读取音频转录，长视频内存占用固定")
+    for pool in ("download", "transcribe", "translate", "mux", "upload"):
+        parser.add_argument(f"--{pool}-workers", type=int, help=f"批量模式下 {pool} 阶段的并发数")
+    parser.add_argument("--profile-dir", help="将每个任务的各阶段耗时、CPU和内存写入此目录下的JSON文件")
+    parser.add_argument("--reprocess", action="store_true", help="重新处理已上传到B站的视频")
+    parser.add_argument("--list-index", action="store_true", help="列出已处理的视频")
+    parser.add_argument("--purge-index", nargs="*", metavar="VIDEO", help="从已处理索引中删除视频 (ID或链接，不指定则全部删除)")
+    args = parser.parse_args()
+
+    if args.list_index or args.purge_index is not None:
+        video_index = VideoIndex()
+        if args.purge_index is not None:
+            video_ids = [extract_video_id(video) or video for video in args.purge_index] or None
+            # The agent's default manifest directory
+            removed = purge_videos(video_index, os.path.join("./work", "manifests"), video_ids)
+            print(f"已删除 {removed} 个视频")
+        if args.list_index:
+            for entry in video_index.list():
+                submission = entry["submission"] or {}
+                print(f"{entry['video_id']}  {entry['youtube_url']}  阶段: {','.join(entry['stages'])}  "
+                      f"B站: {submission.get('bvid') or submission.get('method') or '-'}")
         return
-    
-    youtube_url = sys.argv[1]
-    
-    # Default values (can be customized)
-    video_title = "从YouTube转载的视频"
-    video_description = "这是一个从YouTube转载并添加了双语字幕的视频。"
-    video_tags = ["转载", "双语字幕", "YouTube"]
-    
+
+    urls = list(args.youtube_urls)
+    if args.batch_file:
+        with open(args.batch_file, "r", encoding="utf-8") as f:
+            urls.extend(line.strip() for line in f if line.strip() and not line.lstrip().startswith("#"))
+    if not urls:
+        parser.error("请提供YouTube链接或 --batch-file")
+
+    agent_options = {
+        "resume": not args.no_resume,
+        "force_stages": args.force_stage,
+        "audio_first": args.audio_first,
+        "streaming": args.streaming,
+        "skip_uploaded": not args.reprocess,
+        "profile_dir": args.profile_dir,
+        "whisper_model": args.whisper_model,
+        "subtitle_mode": args.subtitle_mode,
+        "burn_workers": args.burn_workers,
+        "transcription_engine": args.engine,
+        "compute_type": args.compute_type,
+        "transcription_options": {"windowed": True} if args.windowed else None,
+    }
+    videos = expand_video_urls(urls)
+    if len(videos) != 1 or args.batch_file:
+        pool_sizes = {
+            pool: getattr(args, f"{pool}_workers")
+            for pool in ("download", "transcribe", "translate", "mux", "upload")
+            if getattr(args, f"{pool}_workers")
+        }
+        print(f"=== 批量处理 {len(videos)} 个视频 ===")
+        report, jobs = run_batch(videos, agent_options, pool_sizes)
+        _print_report(report, jobs)
+        return
+
     # Initialize agent
-    agent = YouTubeToBilibiliAgent()
+    agent = YouTubeToBilibiliAgent(**agent_options)
     
     # Process video
-    result = agent.process_video(youtube_url, video_title, video_description, video_tags)
+    result = agent.process_video(videos[0]["url"], videos[0]["title"] or DEFAULT_VIDEO_TITLE, DEFAULT_VIDEO_DESCRIPTION,
+                                 DEFAULT_VIDEO_TAGS)
     
     # Print results
     print("\n=== 处理结果 ===")
@@ -0,0 +1,279 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+SECONDS_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+BYTES_BUCKETS = tuple(2 ** i * 1024 * 1024 for i in range(7, 15))  # 128 MB .. 16 GB
+# Interval between resident memory samples while spans are open, in seconds
+RSS_SAMPLE_INTERVAL = 0.2
+
+
+def process_tree_rss(pid):
+    """
+    Returns the resident memory in bytes of a process and all its descendants.
+
+    Reads /proc, so it returns 0 on systems without it.
+    """
+    total = 0
+    pending = [pid]
+    while pending:
+        pid = pending.pop()
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+            for task in os.listdir(f"/proc/{pid}/task"):
+                with open(f"/proc/{pid}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}  # sorted label tuple -> value
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._values = {}  # sorted label tuple -> ([bucket counts], sum, count)
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._values.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', bound),))} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, help_text, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, help_text):
+        return self._get(Counter, name, help_text)
+
+    def histogram(self, name, help_text, buckets=SECONDS_BUCKETS):
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def render(self):
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry exposed by the API
+registry = MetricsRegistry()
+
+span_seconds = registry.histogram("pipeline_span_seconds", "Wall time of pipeline stages and steps")
+span_cpu_seconds = registry.histogram("pipeline_span_cpu_seconds", "CPU time of the thread running a stage or step")
+span_child_cpu_seconds = registry.histogram(
+    "pipeline_span_child_cpu_seconds", "CPU time of child processes (e.g. ffmpeg) that exited during a stage or step"
+)
+span_peak_rss_bytes = registry.histogram(
+    "pipeline_span_peak_rss_bytes", "Peak resident memory of the process and its children during a stage or step",
+    buckets=BYTES_BUCKETS
+)
+spans_total = registry.counter("pipeline_spans_total", "Finished stages and steps by status")
+
+
+class Span:
+    """
+    Timing of one stage or step. See span().
+    """
+
+    def __init__(self, name, parent=None, collector=None, **attributes):
+        self.name = name
+        self.parent = parent
+        self.collector = collector if collector is not None else (parent.collector if parent else None)
+        self.attributes = attributes
+        self.counters = {}
+        self.status = "ok"
+        self.peak_rss_bytes = 0
+        self.started_at = time.time()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+        self._child_cpu_start = self._child_cpu_time()
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.child_cpu_seconds = None
+
+    @staticmethod
+    def _child_cpu_time():
+        times = os.times()
+        return times.children_user + times.children_system
+
+    def finish(self):
+        self.wall_seconds = time.perf_counter() - self._wall_start
+        self.cpu_seconds = time.thread_time() - self._cpu_start
+        self.child_cpu_seconds = self._child_cpu_time() - self._child_cpu_start
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "status": self.status,
+            "started_at": self.started_at,
+            "wall_seconds": self.wall_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "child_cpu_seconds": self.child_cpu_seconds,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "counters": self.counters,
+            **self.attributes,
+        }
+
+
+_local = threading.local()
+_open_spans = set()
+_open_spans_lock = threading.Lock()
+_sampler = None
+# Spans continued in other threads share their parents' counters
+_counters_lock = threading.Lock()
+
+
+def _sample_rss():
+    while True:
+        with _open_spans_lock:
+            spans = list(_open_spans)
+        if spans:
+            rss = process_tree_rss(os.getpid())
+            for open_span in spans:
+                open_span.peak_rss_bytes = max(open_span.peak_rss_bytes, rss)
+        time.sleep(RSS_SAMPLE_INTERVAL)
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def span(name, collector=None, parent=None, **attributes):
+    """
+    Measures a stage or step of the pipeline.
+
+    Records wall time, CPU time of the current thread, CPU time of child processes that
+    exited meanwhile and peak resident memory of the process tree (sampled) into the
+    shared registry. Child CPU and memory are process-wide, so they include other jobs
+    running concurrently. Spans nest per thread; counters added with record() go to every
+    open span of the thread and to pipeline_<name>_total, labelled with the outermost span.
+    Work handed to another thread can continue a span there by passing it as parent.
+
+    Args:
+        name (str): The span name, e.g. the stage name.
+        collector (list): Optional list the finished span dicts of this span and its
+            children are appended to, e.g. for a per-job profile.
+        parent (Span): The parent span. Defaults to the innermost open span of this thread.
+        **attributes: Extra fields for the span dict.
+
+    Yields:
+        Span: The open span.
+    """
+    global _sampler
+    stack = _stack()
+    current = Span(name, parent or (stack[-1] if stack else None), collector, **attributes)
+    current.peak_rss_bytes = process_tree_rss(os.getpid())
+    stack.append(current)
+    with _open_spans_lock:
+        _open_spans.add(current)
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_rss, name="rss-sampler", daemon=True)
+            _sampler.start()
+    try:
+        yield current
+    except BaseException:
+        current.status = "error"
+        raise
+    finally:
+        current.finish()
+        stack.pop()
+        with _open_spans_lock:
+            _open_spans.discard(current)
+        span_seconds.observe(current.wall_seconds, span=name)
+        span_cpu_seconds.observe(current.cpu_seconds, span=name)
+        span_child_cpu_seconds.observe(current.child_cpu_seconds, span=name)
+        span_peak_rss_bytes.observe(current.peak_rss_bytes, span=name)
+        spans_total.inc(span=name, status=current.status)
+        if current.collector is not None:
+            current.collector.append(current.to_dict())
+
+
+def current_span():
+    """
+    Returns the innermost open span of this thread, or None.
+    """
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+def record(name, amount, help_text=None):
+    """
+    Adds amount to the counter name (e.g. "bytes_downloaded") of the innermost open span
+    of this thread and its parents.
+
+    Outside of any span, only the Prometheus counter is updated, without a span label.
+    """
+    open_span = outermost = current_span()
+    with _counters_lock:
+        while open_span is not None:
+            open_span.counters[name] = open_span.counters.get(name, 0) + amount
+            outermost = open_span
+            open_span = open_span.parent
+    labels = {"span": outermost.name} if outermost else {}
+    registry.counter(f"pipeline_{name}_total", help_text or name.replace("_", " ").capitalize()).inc(amount, **labels)
@@ -0,0 +1,97 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Default memory budget for loaded models, in megabytes. Can be overridden with
+# the MODEL_MEMORY_BUDGET_MB environment variable.
+DEFAULT_MEMORY_BUDGET_MB = int(os.environ.get("MODEL_MEMORY_BUDGET_MB", "4096"))
+
+
+class ModelRegistry:
+    """
+    Process-local registry of loaded models with LRU eviction under a memory budget.
+
+    Models are keyed by an arbitrary hashable key (e.g. (model_name, device)) and
+    handed out as leases, so a model instance is only used by one caller at a time.
+    Concurrent callers asking for the same key get additional instances, which stay
+    loaded for later leases. Only idle instances are evicted, least recently used first.
+    """
+
+    def __init__(self, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+        self.memory_budget_bytes = memory_budget_mb * 1024 * 1024
+        self._idle = OrderedDict()  # id(model) -> (key, model, size_bytes)
+        self._in_use = {}  # id(model) -> (key, model, size_bytes)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def lease(self, key, loader, size_estimator=None):
+        """
+        Leases a model stored under key, loading it with loader() if no idle instance exists.
+
+        Args:
+            key (hashable): The registry key.
+            loader (callable): Zero-argument function that loads the model.
+            size_estimator (callable): Optional function returning the model size in bytes.
+
+        Yields:
+            The loaded model, which is returned to the registry when the block exits.
+        """
+        entry = self._acquire(key, loader, size_estimator)
+        try:
+            yield entry[1]
+        finally:
+            self._release(entry)
+
+    def _acquire(self, key, loader, size_estimator):
+        with self._lock:
+            for model_id, entry in reversed(self._idle.items()):
+                if entry[0] == key:
+                    del self._idle[model_id]
+                    self._in_use[model_id] = entry
+                    return entry
+
+        # Load outside the lock so other callers are not blocked
+        print(f"Loading model {key}...")
+        model = loader()
+        entry = (key, model, size_estimator(model) if size_estimator else 0)
+        with self._lock:
+            self._in_use[id(model)] = entry
+        return entry
+
+    def _release(self, entry):
+        model_id = id(entry[1])
+        with self._lock:
+            self._in_use.pop(model_id, None)
+            self._idle[model_id] = entry
+            self._evict(keep=model_id)
+
+    def _evict(self, keep):
+        total = self._total_size()
+        for model_id in list(self._idle):
+            if total <= self.memory_budget_bytes:
+                break
+            if model_id == keep:
+                continue
+            key, _, size = self._idle.pop(model_id)
+            total -= size
+            print(f"Evicted model {key} ({size / 1024 / 1024:.0f} MB)")
+
+    def _total_size(self):
+        return sum(entry[2] for entry in self._idle.values()) + sum(entry[2] for entry in self._in_use.values())
+
+    def keys(self):
+        with self._lock:
+            return [entry[0] for entry in self._idle.values()] + [entry[0] for entry in self._in_use.values()]
+
+    def memory_usage(self):
+        with self._lock:
+            return self._total_size()
+
+    def clear(self):
+        with self._lock:
+            self._idle.clear()
+
+
+# Shared registry used by the pipeline stages
+registry = ModelRegistry()
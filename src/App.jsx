@@ -21,6 +21,7 @@ function App() {
   const [progress, setProgress] = useState(0)
   const [result, setResult] = useState(null)
   const [error, setError] = useState('')
+  const [jobId, setJobId] = useState(null)
 
   const steps = [
     { icon: Download, label: '下载YouTube视频', description: '从YouTube下载指定视频' },
@@ -28,40 +29,39 @@ function App() {
     { icon: Languages, label: '生成字幕', description: '使用AI生成原始字幕' },
     { icon: Languages, label: '翻译字幕', description: '将字幕翻译为中文' },
     { icon: FileText, label: '合并双语字幕', description: '创建双语字幕文件' },
+    { icon: FileText, label: '合成字幕视频', description: '将双语字幕加入视频' },
     { icon: Upload, label: '上传到B站', description: '将视频上传到哔哩哔哩' }
   ]
 
-  // Poll for status updates when processing
+  // Subscribe to the job's progress events while processing
   useEffect(() => {
-    let interval
-    if (isProcessing) {
-      interval = setInterval(async () => {
-        try {
-          const response = await fetch(`${API_BASE_URL}/api/status`)
-          const status = await response.json()
-          
-          setCurrentStep(status.current_step)
-          setProgress(status.progress)
-          
-          if (!status.is_processing) {
-            setIsProcessing(false)
-            if (status.result) {
-              setResult(status.result)
-            }
-            if (status.error) {
-              setError(status.error)
-            }
-          }
-        } catch (err) {
-          console.error('Failed to fetch status:', err)
+    if (!isProcessing || !jobId) return
+
+    const events = new EventSource(`${API_BASE_URL}/api/jobs/${jobId}/events`)
+    events.onmessage = (message) => {
+      const event = JSON.parse(message.data)
+
+      setCurrentStep(event.current_step)
+      setProgress(event.progress)
+
+      if (event.type === 'job_finish') {
+        events.close()
+        setIsProcessing(false)
+        if (event.result) {
+          setResult(event.result)
         }
-      }, 1000)
+        if (event.error) {
+          setError(event.error)
+        }
+      }
     }
-    
-    return () => {
-      if (interval) clearInterval(interval)
+    events.onerror = (err) => {
+      // EventSource reconnects automatically and resumes from the last event id
+      console.error('Progress event stream error:', err)
     }
-  }, [isProcessing])
+
+    return () => events.close()
+  }, [isProcessing, jobId])
 
   const handleSubmit = async (e) => {
     e.preventDefault()
@@ -75,6 +75,7 @@ function App() {
     setProgress(0)
     setError('')
     setResult(null)
+    setJobId(null)
 
     try {
       const response = await fetch(`${API_BASE_URL}/api/process`, {
@@ -96,7 +97,8 @@ function App() {
         throw new Error(data.error || '处理请求失败')
       }
       
-      // Processing started successfully, status will be updated via polling
+      // Job queued successfully, status will be updated via progress events
+      setJobId(data.job_id)
     } catch (err) {
       setError('启动处理失败: ' + err.message)
       setIsProcessing(false)
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import threading
+
+_manifest_locks = {}
+_manifest_locks_lock = threading.Lock()
+
+
+def _lock_for(path):
+    with _manifest_locks_lock:
+        return _manifest_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    """
+    Returns the SHA-256 hex digest of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stage_key(stage, params, input_hashes):
+    """
+    Returns a content-addressed key for a stage run from its parameters and input file hashes.
+    """
+    payload = json.dumps({"stage": stage, "params": params, "inputs": input_hashes}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class StageManifest:
+    """
+    JSON manifest recording the outputs of each pipeline stage for one video.
+
+    Each stage entry stores the key it was run with, the result fields it produced
+    and the size, modification time and hash of its output files. An entry is valid
+    for a later run if the key matches and the output files are unchanged on disk.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = _lock_for(path)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable manifest {self.path}: {e}")
+            return {}
+
+    def _save(self, data):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, stage, key):
+        """
+        Returns the recorded entry for stage if it was run with key and its output files are intact, None otherwise.
+        """
+        with self._lock:
+            entry = self._load().get(stage)
+        if not entry or entry.get("key") != key:
+            return None
+        for info in entry.get("files", {}).values():
+            try:
+                stat = os.stat(info["path"])
+            except OSError:
+                return None
+            if stat.st_size != info["size"] or stat.st_mtime != info["mtime"]:
+                return None
+        return entry
+
+    def record(self, stage, key, result, files):
+        """
+        Records a completed stage.
+
+        Args:
+            stage (str): The stage name.
+            key (str): The stage key from stage_key.
+            result (dict): Result fields produced by the stage.
+            files (dict): Mapping from result field to output file path; these files are hashed.
+
+        Returns:
+            dict: The recorded entry.
+        """
+        entry = {"key": key, "result": result, "files": {}}
+        for field, path in files.items():
+            stat = os.stat(path)
+            entry["files"][field] = {
+                "path": os.path.abspath(path),
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "sha256": file_sha256(path),
+            }
+        with self._lock:
+            data = self._load()
+            data[stage] = entry
+            self._save(data)
+        return entry
+
+    def invalidate(self, stage=None):
+        """
+        Removes the entry for stage, or all entries if stage is None.
+        """
+        with self._lock:
+            data = self._load()
+            if stage is None:
+                data = {}
+            else:
+                data.pop(stage, None)
+            self._save(data)
@@ -1,31 +1,380 @@
-import datetime
-import whisper
+import multiprocessing
+import numpy as np
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from transcription_engines import get_engine, transcription_model, DEFAULT_ENGINE
+from transcription_cache import audio_fingerprint, get_default_cache
+from audio_extractor import load_pcm, decode_audio, iter_audio_blocks, SAMPLE_RATE
+from subtitles import SrtWriter, seconds_to_ms
+from metrics import span, record
 
-def generate_subtitles(audio_path, output_srt_path, model_name="base"):
+# Chunked transcription defaults
+CHUNK_SECONDS = 120
+# How far from a target chunk boundary to look for silence, in seconds
+SPLIT_SEARCH_SECONDS = 10
+VAD_FRAME_MS = 30
+# Characters of the previous window's text passed as the prompt of the next window
+PROMPT_CHARS = 200
+
+def whisper_model(model_name="base", device=None):
+    """
+    Leases a loaded OpenAI Whisper model from the process-local registry.
+
+    The model stays loaded after the lease ends, so later jobs reuse it. Concurrent
+    callers get separate instances, since a Whisper model cannot run two decodes at once.
+
+    Args:
+        model_name (str): The name of the Whisper model to use.
+        device (str): The device to load the model on (e.g., "cpu", "cuda"). Defaults to CUDA if available.
+
+    Returns:
+        A context manager yielding the loaded whisper.Whisper model.
+    """
+    return transcription_model("whisper", model_name, device)
+
+def find_split_points(audio, chunk_seconds=CHUNK_SECONDS, search_seconds=SPLIT_SEARCH_SECONDS,
+                      sample_rate=SAMPLE_RATE, frame_ms=VAD_FRAME_MS):
+    """
+    Picks chunk boundaries at silence, using short-time energy as a simple voice activity detector.
+
+    Each boundary is placed at the quietest frame within search_seconds of a multiple
+    of chunk_seconds, so chunks are roughly chunk_seconds long and never cut a word
+    unless there is no pause nearby.
+
+    Args:
+        audio (numpy.ndarray): 16 kHz mono float32 samples.
+        chunk_seconds (float): Target chunk length.
+        search_seconds (float): Search window around each target boundary.
+        sample_rate (int): The sample rate of audio.
+        frame_ms (int): Energy frame length in milliseconds.
+
+    Returns:
+        list: Sample offsets of the chunk boundaries, starting with 0 and ending with len(audio).
+    """
+    frame = int(sample_rate * frame_ms / 1000)
+    num_frames = len(audio) // frame
+    chunk_frames = int(chunk_seconds * 1000 / frame_ms)
+    if num_frames <= chunk_frames:
+        return [0, len(audio)]
+
+    energy = np.sqrt(np.mean(np.square(audio[:num_frames * frame].reshape(num_frames, frame)), axis=1))
+    search_frames = int(search_seconds * 1000 / frame_ms)
+
+    splits = [0]
+    target = chunk_frames
+    while target < num_frames - search_frames:
+        low = max(splits[-1] // frame + 1, target - search_frames)
+        high = min(num_frames, target + search_frames)
+        quietest = low + int(np.argmin(energy[low:high]))
+        splits.append(quietest * frame + frame // 2)
+        target = quietest + chunk_frames
+    splits.append(len(audio))
+    return splits
+
+def _init_transcription_worker(threads, engine):
+    # CTranslate2 reads the thread count from OMP_NUM_THREADS
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    if engine == "whisper":
+        import torch
+        torch.set_num_threads(threads)
+
+def _transcribe_chunk(audio, offset, model_name, device, engine, compute_type):
+    # Runs in a worker process; the model stays loaded in that process's registry
+    with transcription_model(engine, model_name, device, compute_type) as model:
+        result = model.transcribe(audio)
+    return [
+        {"start": segment["start"] + offset, "end": segment["end"] + offset, "text": segment["text"]}
+        for segment in result["segments"]
+    ]
+
+# Worker process pools by (workers, threads_per_worker, engine), each with the number of
+# transcribe_chunked calls using it. Jobs can use different settings at the same time.
+_transcription_pools = {}
+_transcription_pools_lock = threading.Lock()
+
+@contextmanager
+def _transcription_pool(workers, threads_per_worker, engine):
+    """
+    Leases the worker pool for a configuration, starting it if needed.
+
+    Pools stay running between calls, so their workers keep the models loaded. Idle
+    pools of other configurations are shut down when a pool is leased.
+    """
+    config = (workers, threads_per_worker, engine)
+    with _transcription_pools_lock:
+        for other, entry in list(_transcription_pools.items()):
+            if other != config and entry["users"] == 0:
+                entry["pool"].shutdown(wait=False)
+                del _transcription_pools[other]
+        entry = _transcription_pools.get(config)
+        if entry is None:
+            # Spawn instead of fork, forking after torch has started its threads is unsafe
+            entry = _transcription_pools[config] = {"users": 0, "pool": ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_transcription_worker,
+                initargs=(threads_per_worker, engine)
+            )}
+        entry["users"] += 1
+    try:
+        yield entry["pool"]
+    finally:
+        with _transcription_pools_lock:
+            entry["users"] -= 1
+
+def transcribe_chunked(audio, model_name="base", device="cpu", workers=None, threads_per_worker=None,
+                       chunk_seconds=CHUNK_SECONDS, engine=DEFAULT_ENGINE, compute_type=None):
+    """
+    Transcribes audio in parallel by splitting it at silence and decoding the chunks in a process pool.
+
+    Args:
+        audio (numpy.ndarray): 16 kHz mono float32 samples.
+        model_name (str): The name of the Whisper model to use.
+        device (str): The device each worker loads its model on.
+        workers (int): Number of worker processes. Defaults to the number of CPU cores divided by threads_per_worker.
+        threads_per_worker (int): Torch or CTranslate2 threads per worker. Defaults to 2.
+        chunk_seconds (float): Target chunk length.
+        engine (str): The transcription engine, see transcription_engines.
+        compute_type (str): The engine's compute type, e.g. "int8" for faster-whisper.
+
+    Returns:
+        list: Segment dicts with "start", "end" (seconds, relative to the whole audio) and "text".
+    """
+    threads_per_worker = threads_per_worker or 2
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+    splits = find_split_points(audio, chunk_seconds)
+    print(f"Transcribing {len(splits) - 1} chunks with {workers} workers x {threads_per_worker} threads")
+
+    segments = []
+    with _transcription_pool(workers, threads_per_worker, engine) as pool:
+        futures = [
+            pool.submit(_transcribe_chunk, audio[start:end], start / SAMPLE_RATE, model_name, device, engine, compute_type)
+            for start, end in zip(splits, splits[1:])
+        ]
+        for future in futures:
+            for segment in future.result():
+                # Whisper can run slightly past the end of a chunk; keep times monotonic
+                if segments and segment["start"] < segments[-1]["end"]:
+                    segment["start"] = segments[-1]["end"]
+                segment["end"] = max(segment["end"], segment["start"])
+                segments.append(segment)
+    return segments
+
+def iter_audio_windows(audio, window_seconds=CHUNK_SECONDS, search_seconds=SPLIT_SEARCH_SECONDS):
+    """
+    Cuts audio into windows of roughly window_seconds at silence, reading it incrementally.
+
+    Only about two windows of samples are held at a time, so memory does not grow with
+    the length of the audio.
+
+    Args:
+        audio (str or numpy.ndarray): A raw 16 kHz mono PCM file (.pcm), any other media file
+            (decoded over an ffmpeg pipe), or 16 kHz mono float32 samples.
+        window_seconds (float): Target window length.
+        search_seconds (float): How far from the target length to look for silence.
+
+    Yields:
+        tuple: The sample offset of the window in the whole audio, and its float32 samples.
+    """
+    window = int(window_seconds * SAMPLE_RATE)
+    # find_split_points searches on both sides of the target, so keep that much audio buffered
+    lookahead = window + 2 * int(search_seconds * SAMPLE_RATE) + 1
+    if isinstance(audio, str):
+        blocks = iter_audio_blocks(audio, window)
+    else:
+        blocks = (audio[start:start + window] for start in range(0, len(audio), window))
+
+    buffer = np.zeros(0, dtype=np.float32)
+    offset = 0
+    for block in blocks:
+        buffer = np.concatenate([buffer, block])
+        while len(buffer) >= lookahead:
+            split = find_split_points(buffer[:lookahead], window_seconds, search_seconds)[1]
+            yield offset, buffer[:split]
+            offset += split
+            buffer = buffer[split:]
+    splits = find_split_points(buffer, window_seconds, search_seconds)
+    for start, end in zip(splits, splits[1:]):
+        if end > start:
+            yield offset + start, buffer[start:end]
+
+def transcribe_stream(audio, model_name="base", device=None, window_seconds=CHUNK_SECONDS, engine=DEFAULT_ENGINE,
+                      compute_type=None):
+    """
+    Transcribes audio window by window and yields segments as soon as each window is decoded.
+
+    Windows are split at silence and read incrementally (see iter_audio_windows), so
+    peak memory does not depend on the length of the audio. The end of each window's
+    text is passed to the next window as its prompt so the decoding context carries over.
+
+    Args:
+        audio (str or numpy.ndarray): A .pcm file, a media file or 16 kHz mono float32 samples.
+        model_name (str): The name of the Whisper model to use.
+        device (str): The device to run the model on.
+        window_seconds (float): Target window length.
+        engine (str): The transcription engine, see transcription_engines.
+        compute_type (str): The engine's compute type.
+
+    Yields:
+        dict: Segments with "start", "end" (seconds, relative to the whole audio) and "text", in order.
     """
-    Generates subtitles from an audio file using OpenAI Whisper.
+    prompt = None
+    last_end = 0
+    with transcription_model(engine, model_name, device, compute_type) as model:
+        for start, samples in iter_audio_windows(audio, window_seconds):
+            result = model.transcribe(samples, initial_prompt=prompt)
+            record("audio_seconds", len(samples) / SAMPLE_RATE)
+            offset = start / SAMPLE_RATE
+            for segment in result["segments"]:
+                segment_start = max(segment["start"] + offset, last_end)
+                last_end = max(segment["end"] + offset, segment_start)
+                yield {"start": segment_start, "end": last_end, "text": segment["text"]}
+            prompt = result["text"][-PROMPT_CHARS:] or None
+
+def load_audio(audio):
+    """
+    Returns 16 kHz mono float32 samples for an audio file path, a .pcm file or an array.
+    """
+    if isinstance(audio, str):
+        if audio.endswith(".pcm"):
+            # Already decoded to 16 kHz mono, so Whisper does not need to run ffmpeg again
+            return load_pcm(audio)
+        samples = decode_audio(audio)
+        if samples is None:
+            raise RuntimeError(f"Failed to decode {audio}")
+        return samples
+    return audio
+
+def transcription_cache_key(cache, audio, model_name, engine, compute_type, options, fingerprint=None, device=None):
+    """
+    Returns the transcription cache key of audio transcribed with the given settings.
 
     Args:
-        audio_path (str): The path to the input audio file.
+        cache (TranscriptionCache): The cache.
+        audio (str or numpy.ndarray): The audio, fingerprinted unless fingerprint is given.
+        options (dict): Other settings that change the segments, e.g. the window length.
+        fingerprint (str): The audio_fingerprint of audio, if already known.
+        device (str): The device the model runs on. Part of the key, since the default
+            compute type can differ by device (Whisper runs fp16 on CUDA, fp32 on CPU).
+            None is resolved without loading the engine, see TranscriptionEngine.key_device.
+    """
+    engine = get_engine(engine)
+    compute_type = engine.check_compute_type(compute_type)
+    options = dict(options, device=engine.key_device(device))
+    with span("transcription_cache.fingerprint"):
+        fingerprint = fingerprint or audio_fingerprint(audio)
+    return cache.make_key(fingerprint, engine.name, model_name, compute_type, options)
+
+def get_cached_transcription(cache, key):
+    """
+    Returns the cached segments for key, or None if there are none or the cache fails.
+    """
+    try:
+        return cache.get(key)
+    except Exception as e:
+        print(f"Transcription cache lookup failed: {e}")
+        return None
+
+def put_cached_transcription(cache, key, segments):
+    """
+    Stores segments in the cache. A failure is logged, as the transcription itself succeeded.
+    """
+    try:
+        cache.put(key, segments)
+    except Exception as e:
+        print(f"Failed to store transcription in cache: {e}")
+
+def _collect(segments, collected):
+    for segment in segments:
+        collected.append(segment)
+        yield segment
+
+def _write_srt(segments, output_srt_path, flush=False):
+    with SrtWriter(output_srt_path) as writer:
+        for segment in segments:
+            writer.write(seconds_to_ms(segment["start"]), seconds_to_ms(segment["end"]), segment["text"].strip())
+            if flush:
+                writer.flush()
+
+def generate_subtitles(audio_path, output_srt_path, model_name="base", device=None,
+                       chunked=False, workers=None, threads_per_worker=None, chunk_seconds=CHUNK_SECONDS,
+                       windowed=False, engine=DEFAULT_ENGINE, compute_type=None, use_cache=True, cache=None,
+                       fingerprint=None):
+    """
+    Generates subtitles from an audio file using OpenAI Whisper or another transcription engine.
+
+    Args:
+        audio_path (str or numpy.ndarray): The path to the input audio file, a raw 16 kHz mono
+            PCM file (.pcm) from extract_audio_pcm, or 16 kHz mono float32 samples.
         output_srt_path (str): The path to save the generated SRT file.
         model_name (str): The name of the Whisper model to use (e.g., "base", "small", "medium", "large").
+        device (str): The device to run the model on. Defaults to CUDA if available.
+        chunked (bool): Split the audio at silence and transcribe the chunks in parallel processes.
+        workers (int): Number of worker processes in chunked mode.
+        threads_per_worker (int): Torch threads per worker process in chunked mode.
+        chunk_seconds (float): Target chunk length in chunked and windowed mode.
+        windowed (bool): Read and transcribe the audio one window at a time and write cues as
+            each window completes, with memory independent of the audio length.
+        engine (str): The transcription engine: "whisper" (default) or "faster-whisper" (CTranslate2, int8 on CPU).
+        compute_type (str): The engine's compute type, defaults to the engine's default.
+        use_cache (bool): Whether to look up and store the result in the transcription cache.
+        cache (TranscriptionCache): The cache to use; defaults to the shared on-disk cache.
+        fingerprint (str): The audio_fingerprint of the audio if already known, e.g. the
+            SHA-256 of a .pcm file, so it is not hashed again.
 
     Returns:
         str: The path to the generated SRT file if successful, None otherwise.
     """
     try:
-        model = whisper.load_model(model_name)
-        result = model.transcribe(audio_path)
-        
-        with open(output_srt_path, "w", encoding="utf-8") as f:
-            for segment in result["segments"]:
-                start_time = str(0) + str(datetime.timedelta(seconds=segment["start"])) + ",000"
-                end_time = str(0) + str(datetime.timedelta(seconds=segment["end"])) + ",000"
-                text = segment["text"]
-                f.write(f"{segment['id'] + 1}\n")
-                f.write(f"{start_time} --> {end_time}\n")
-                f.write(f"{text.strip()}\n\n")
+        key = None
+        if chunked and not windowed:
+            # Chunk workers load their models on the CPU unless told otherwise
+            device = device or "cpu"
+        if use_cache:
+            if isinstance(audio_path, str) and not audio_path.endswith(".pcm") and not windowed:
+                # Decode once for both the fingerprint and the transcription
+                audio_path = load_audio(audio_path)
+            options = {"chunk_seconds": chunk_seconds, "windowed": True} if windowed else \
+                {"chunk_seconds": chunk_seconds, "chunked": True} if chunked else {}
+            try:
+                cache = cache or get_default_cache()
+                key = transcription_cache_key(cache, audio_path, model_name, engine, compute_type, options, fingerprint,
+                                              device)
+            except Exception as e:
+                # Transcribe without the cache rather than fail
+                print(f"Transcription cache unavailable: {e}")
+            segments = get_cached_transcription(cache, key) if key else None
+            if segments is not None:
+                _write_srt(segments, output_srt_path)
+                print("Subtitle generation successful! (transcription cache hit)")
+                return output_srt_path
+
+        if windowed:
+            segments = []
+            with span("whisper.transcribe", model=model_name, engine=engine, windowed=True):
+                # Cues become visible in the file as each window completes
+                _write_srt(_collect(transcribe_stream(audio_path, model_name, device, chunk_seconds, engine, compute_type),
+                                    segments), output_srt_path, flush=True)
+            if key:
+                put_cached_transcription(cache, key, segments)
+            print("Subtitle generation successful!")
+            return output_srt_path
+
+        with span("whisper.transcribe", model=model_name, engine=engine, chunked=chunked):
+            audio = load_audio(audio_path)
+            if chunked:
+                segments = transcribe_chunked(audio, model_name, device, workers, threads_per_worker, chunk_seconds,
+                                              engine, compute_type)
+            else:
+                with transcription_model(engine, model_name, device, compute_type) as model:
+                    segments = model.transcribe(audio)["segments"]
+            record("audio_seconds", len(audio) / SAMPLE_RATE)
+
+        _write_srt(segments, output_srt_path)
+        if key:
+            put_cached_transcription(cache, key, segments)
         
         print("Subtitle generation successful!")
         return output_srt_path
@@ -0,0 +1,189 @@
+import csv
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from subtitles import read_srt, CueList, write_srt
+from metrics import span
+
+# Language tag of the soft subtitle track (ISO 639-2)
+SUBTITLE_LANGUAGE = "chi"
+# Burn-in mode: segment length and x264 settings. Segments are cut at the first
+# keyframe after each multiple of the segment length.
+BURN_SEGMENT_SECONDS = float(os.environ.get("BURN_SEGMENT_SECONDS", "30"))
+BURN_PRESET = os.environ.get("BURN_PRESET", "veryfast")
+BURN_CRF = int(os.environ.get("BURN_CRF", "20"))
+
+def _run(command, cwd=None):
+    print(f"Executing command: {' '.join(command)}")
+    return subprocess.run(command, capture_output=True, text=True, check=True, cwd=cwd)
+
+def mux_soft_subtitles(video_path, srt_path, output_path, language=SUBTITLE_LANGUAGE):
+    """
+    Adds an SRT file to a video as a soft subtitle track, without re-encoding.
+
+    Video and audio are stream-copied; only the subtitles are converted to MP4 timed
+    text (mov_text), so this takes about as long as copying the file.
+
+    Args:
+        video_path (str): The path to the input MP4 video.
+        srt_path (str): The path to the SRT file.
+        output_path (str): The path to save the video with subtitles.
+        language (str): ISO 639-2 language tag of the subtitle track.
+
+    Returns:
+        str: The path to the output video if successful, None otherwise.
+    """
+    try:
+        command = [
+            "ffmpeg",
+            "-nostdin",
+            "-i", video_path,
+            "-i", srt_path,
+            "-map", "0:v",
+            "-map", "0:a?",
+            "-map", "1:0",
+            "-c", "copy",
+            "-c:s", "mov_text",
+            "-metadata:s:s:0", f"language={language}",
+            "-disposition:s:0", "default",
+            "-movflags", "+faststart",
+            "-y",
+            output_path
+        ]
+        with span("ffmpeg.mux_subtitles"):
+            _run(command)
+        print("Subtitle muxing successful!")
+        return output_path
+    except subprocess.CalledProcessError as e:
+        print(f"Error muxing subtitles: {e}")
+        print("STDERR:", e.stderr)
+        return None
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+        return None
+
+def split_at_keyframes(video_path, output_dir, segment_seconds=BURN_SEGMENT_SECONDS):
+    """
+    Splits the video stream of a file into segments at keyframes, without re-encoding.
+
+    Returns:
+        list: (segment file name in output_dir, start seconds, end seconds) tuples, in order.
+    """
+    list_path = os.path.join(output_dir, "segments.csv")
+    _run([
+        "ffmpeg",
+        "-nostdin",
+        "-i", video_path,
+        "-map", "0:v:0",
+        "-c", "copy",
+        "-f", "segment",
+        "-segment_time", str(segment_seconds),
+        "-segment_list", list_path,
+        "-segment_list_type", "csv",
+        "-reset_timestamps", "1",
+        "-y",
+        os.path.join(output_dir, "segment%05d.mp4")
+    ])
+    with open(list_path, "r", encoding="utf-8", newline="") as f:
+        return [(name, float(start), float(end)) for name, start, end in csv.reader(f)]
+
+def _segment_cues(cues, start_ms, end_ms):
+    # Cues overlapping the segment, shifted to the segment's own timeline
+    segment_cues = CueList()
+    for cue in cues:
+        if cue.end > start_ms and cue.start < end_ms:
+            segment_cues.append(max(cue.start, start_ms) - start_ms, min(cue.end, end_ms) - start_ms, cue.text)
+    return segment_cues
+
+def _encode_segment(segment_dir, name, threads):
+    base = os.path.splitext(name)[0]
+    # Relative names, so the subtitles filter argument needs no escaping
+    _run([
+        "ffmpeg",
+        "-nostdin",
+        "-i", name,
+        "-vf", f"subtitles={base}.srt",
+        "-c:v", "libx264",
+        "-preset", BURN_PRESET,
+        "-crf", str(BURN_CRF),
+        "-pix_fmt", "yuv420p",
+        "-threads", str(threads),
+        "-y",
+        f"{base}.burned.mp4"
+    ], cwd=segment_dir)
+    return f"{base}.burned.mp4"
+
+def burn_subtitles(video_path, srt_path, output_path, workers=None, segment_seconds=BURN_SEGMENT_SECONDS,
+                   progress_callback=None):
+    """
+    Renders subtitles into the video frames, encoding keyframe-aligned segments in parallel.
+
+    The video stream is split at keyframes without re-encoding, each segment is encoded
+    with its share of the subtitles by its own ffmpeg process, and the encoded segments
+    are concatenated without re-encoding. The original audio is copied as is.
+
+    Args:
+        video_path (str): The path to the input MP4 video.
+        srt_path (str): The path to the SRT file.
+        output_path (str): The path to save the video with burned-in subtitles.
+        workers (int): Number of concurrent encodes. Defaults to the number of CPU cores.
+        segment_seconds (float): Target segment length.
+        progress_callback (callable): Optional function called with (encoded_segments, total_segments).
+
+    Returns:
+        str: The path to the output video if successful, None otherwise.
+    """
+    workers = workers or os.cpu_count() or 1
+    segment_dir = tempfile.mkdtemp(prefix="burn-", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        with span("ffmpeg.burn_subtitles", workers=workers):
+            with span("ffmpeg.split_segments"):
+                segments = split_at_keyframes(video_path, segment_dir, segment_seconds)
+            cues = read_srt(srt_path)
+            for name, start, end in segments:
+                segment_cues = _segment_cues(cues, round(start * 1000), round(end * 1000))
+                write_srt(segment_cues, os.path.join(segment_dir, os.path.splitext(name)[0] + ".srt"))
+            print(f"Encoding {len(segments)} segments with {workers} workers")
+
+            # Each encode is an ffmpeg process; split the cores between them
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            encoded = []
+            with span("ffmpeg.encode_segments", segments=len(segments)), \
+                    ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_encode_segment, segment_dir, name, threads) for name, _, _ in segments]
+                for future in futures:
+                    encoded.append(future.result())
+                    if progress_callback:
+                        progress_callback(len(encoded), len(segments))
+
+            list_path = os.path.join(segment_dir, "concat.txt")
+            with open(list_path, "w", encoding="utf-8") as f:
+                f.writelines(f"file '{name}'\n" for name in encoded)
+            with span("ffmpeg.concat_segments"):
+                _run([
+                    "ffmpeg",
+                    "-nostdin",
+                    "-f", "concat",
+                    "-safe", "0",
+                    "-i", list_path,
+                    "-i", video_path,
+                    "-map", "0:v",
+                    "-map", "1:a?",
+                    "-c", "copy",
+                    "-movflags", "+faststart",
+                    "-y",
+                    output_path
+                ])
+        print("Subtitle burn-in successful!")
+        return output_path
+    except subprocess.CalledProcessError as e:
+        print(f"Error burning subtitles: {e}")
+        print("STDERR:", e.stderr)
+        return None
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+        return None
+    finally:
+        shutil.rmtree(segment_dir, ignore_errors=True)
@@ -0,0 +1,153 @@
+import queue
+import threading
+from subtitle_generator import (
+    transcribe_stream, transcription_cache_key, get_cached_transcription, put_cached_transcription, CHUNK_SECONDS
+)
+from transcription_engines import DEFAULT_ENGINE
+from subtitle_translator import translate_texts_cached, MAX_BATCH_ITEMS
+from audio_extractor import pcm_duration, SAMPLE_RATE
+from subtitles import SrtWriter, seconds_to_ms
+from metrics import span, current_span
+
+# Maximum number of transcribed segments waiting for translation
+QUEUE_SIZE = 256
+
+_DONE = object()
+
+
+def stream_bilingual_subtitles(audio_path, original_srt_path, translated_srt_path, bilingual_srt_path,
+                               target_language, model_name="base", device=None, window_seconds=CHUNK_SECONDS,
+                               translate_client=None, cache=None, batch_size=MAX_BATCH_ITEMS,
+                               queue_size=QUEUE_SIZE, progress_callback=None, engine=DEFAULT_ENGINE, compute_type=None,
+                               transcription_cache=None, fingerprint=None):
+    """
+    Transcribes, translates and merges subtitles as a streaming pipeline.
+
+    A producer thread transcribes the audio window by window and pushes segments into
+    a bounded queue. The consumer batches whatever segments are waiting, translates
+    them, and appends cues to the original, translated and bilingual SRT files as it
+    goes, so translation overlaps transcription and the files can be previewed while
+    the job is still running.
+
+    Args:
+        audio_path (str or numpy.ndarray): Audio to transcribe, see generate_subtitles.
+        original_srt_path (str): The path to write the original-language SRT file.
+        translated_srt_path (str): The path to write the translated SRT file.
+        bilingual_srt_path (str): The path to write the bilingual SRT file.
+        target_language (str): The target language code.
+        model_name (str): The name of the Whisper model to use.
+        device (str): The device to run the model on.
+        window_seconds (float): Transcription window length.
+        translate_client: Optional translation client, see translate_texts.
+        cache (TranslationCache): Optional translation cache.
+        batch_size (int): Maximum number of segments per translation batch.
+        queue_size (int): Maximum number of segments waiting for translation.
+        progress_callback (callable): Optional function called with (transcribed_seconds, total_seconds, cues).
+            total_seconds is None when the length of the audio is not known up front.
+        engine (str): The transcription engine, see transcription_engines.
+        compute_type (str): The engine's compute type.
+        transcription_cache (TranscriptionCache): Optional transcription cache. On a hit the
+            cached segments are translated without loading a model.
+        fingerprint (str): The audio_fingerprint of the audio if already known.
+
+    Returns:
+        int: The number of cues written.
+    """
+    # Audio files are read window by window rather than loaded whole
+    if not isinstance(audio_path, str):
+        total_seconds = len(audio_path) / SAMPLE_RATE
+    elif audio_path.endswith(".pcm"):
+        total_seconds = pcm_duration(audio_path)
+    else:
+        total_seconds = None
+    segments = queue.Queue(maxsize=queue_size)
+    producer_error = []
+    stop = threading.Event()
+    parent_span = current_span()
+
+    def produce():
+        try:
+            with span("whisper.transcribe_stream", parent=parent_span, model=model_name, engine=engine):
+                key = cached = None
+                if transcription_cache:
+                    # Same key as generate_subtitles in windowed mode
+                    try:
+                        key = transcription_cache_key(transcription_cache, audio_path, model_name, engine, compute_type,
+                                                      {"chunk_seconds": window_seconds, "windowed": True}, fingerprint,
+                                                      device)
+                    except Exception as e:
+                        # Transcribe without the cache rather than fail
+                        print(f"Transcription cache unavailable: {e}")
+                    cached = get_cached_transcription(transcription_cache, key) if key else None
+                collected = []
+                source = cached if cached is not None else \
+                    transcribe_stream(audio_path, model_name, device, window_seconds, engine, compute_type)
+                for segment in source:
+                    if stop.is_set():
+                        return
+                    collected.append(segment)
+                    segments.put(segment)
+                if key and cached is None:
+                    put_cached_transcription(transcription_cache, key, collected)
+        except Exception as e:
+            producer_error.append(e)
+        finally:
+            segments.put(_DONE)
+
+    producer = threading.Thread(target=produce, name="transcription-producer", daemon=True)
+    producer.start()
+
+    try:
+        cues = _consume(segments, total_seconds, original_srt_path, translated_srt_path, bilingual_srt_path,
+                        target_language, translate_client, cache, batch_size, progress_callback)
+    except Exception:
+        # Unblock the producer so it releases the model
+        stop.set()
+        while producer.is_alive():
+            try:
+                segments.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        raise
+    finally:
+        producer.join()
+
+    if producer_error:
+        raise producer_error[0]
+    return cues
+
+
+def _consume(segments, total_seconds, original_srt_path, translated_srt_path, bilingual_srt_path,
+             target_language, translate_client, cache, batch_size, progress_callback):
+    with SrtWriter(original_srt_path) as original_writer, \
+            SrtWriter(translated_srt_path) as translated_writer, \
+            SrtWriter(bilingual_srt_path) as bilingual_writer:
+        done = False
+        while not done:
+            # Block for the first segment, then take whatever else is already waiting
+            batch = [segments.get()]
+            while len(batch) < batch_size:
+                try:
+                    batch.append(segments.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is _DONE:
+                batch.pop()
+                done = True
+            if not batch:
+                continue
+
+            texts = [segment["text"].strip() for segment in batch]
+            translations = translate_texts_cached(texts, target_language, translate_client, cache)
+            for segment, text, translated_text in zip(batch, texts, translations):
+                start, end = seconds_to_ms(segment["start"]), seconds_to_ms(segment["end"])
+                original_writer.write(start, end, text)
+                translated_writer.write(start, end, translated_text)
+                bilingual_writer.write(start, end, f"{text}\n{translated_text}")
+            for writer in (original_writer, translated_writer, bilingual_writer):
+                writer.flush()
+
+            if progress_callback:
+                transcribed = batch[-1]["end"] if total_seconds is None else min(batch[-1]["end"], total_seconds)
+                progress_callback(transcribed, total_seconds, bilingual_writer.count)
+        return bilingual_writer.count
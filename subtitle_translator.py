@@ -1,33 +1,168 @@
-from google.cloud import translate_v2 as translate
-import pysrt
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from subtitles import read_srt, write_srt, CueList
+from translation_cache import get_default_cache
+from metrics import span, record
 
-def translate_subtitle(srt_path, target_language, output_srt_path):
+# Google Cloud Translate v2 accepts at most 128 text segments per request and
+# recommends keeping a request below 5000 characters.
+MAX_BATCH_ITEMS = 128
+MAX_BATCH_CHARS = 5000
+MAX_CONCURRENT_BATCHES = 4
+
+# Provider name used in translation cache keys
+TRANSLATION_PROVIDER = "google-translate-v2"
+
+def _create_translate_client():
+    from google.cloud import translate_v2 as translate
+    return translate.Client()
+
+def make_batches(texts, max_items=MAX_BATCH_ITEMS, max_chars=MAX_BATCH_CHARS):
+    """
+    Groups texts into batches bounded by item count and total character count.
+
+    Args:
+        texts (list): The texts to group.
+        max_items (int): Maximum number of texts per batch.
+        max_chars (int): Maximum total characters per batch. A single longer text gets its own batch.
+
+    Returns:
+        list: A list of batches, each a list of indices into texts.
+    """
+    batches = []
+    current = []
+    current_chars = 0
+    for i, text in enumerate(texts):
+        if current and (len(current) >= max_items or current_chars + len(text) > max_chars):
+            batches.append(current)
+            current = []
+            current_chars = 0
+        current.append(i)
+        current_chars += len(text)
+    if current:
+        batches.append(current)
+    return batches
+
+def translate_texts(texts, target_language, translate_client=None, max_items=MAX_BATCH_ITEMS,
+                    max_chars=MAX_BATCH_CHARS, max_workers=MAX_CONCURRENT_BATCHES, progress_callback=None):
+    """
+    Translates a list of texts in batched, concurrent requests.
+
+    Args:
+        texts (list): The texts to translate.
+        target_language (str): The target language code.
+        translate_client: A client with a Google Cloud Translate v2 compatible translate() method.
+        max_items (int): Maximum number of texts per request.
+        max_chars (int): Maximum total characters per request.
+        max_workers (int): Maximum number of requests in flight.
+        progress_callback (callable): Optional function called with (translated_count, total) after each batch.
+
+    Returns:
+        list: The translated texts, in the same order as texts.
+    """
+    if translate_client is None:
+        translate_client = _create_translate_client()
+
+    translated = [None] * len(texts)
+    batches = make_batches(texts, max_items, max_chars)
+    done = [0]
+    done_lock = threading.Lock()
+
+    def translate_batch(indices):
+        results = translate_client.translate([texts[i] for i in indices], target_language=target_language)
+        if len(results) != len(indices):
+            raise ValueError(f"Expected {len(indices)} translations, got {len(results)}")
+        for i, result in zip(indices, results):
+            translated[i] = result["translatedText"]
+        if progress_callback:
+            with done_lock:
+                done[0] += len(indices)
+                progress_callback(done[0], len(texts))
+
+    with span("translate.requests", batches=len(batches)), \
+            ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        # list() re-raises the first exception from any batch
+        list(executor.map(translate_batch, batches))
+    record("translation_requests", len(batches))
+    record("characters_translated", sum(len(text) for text in texts))
+
+    return translated
+
+def translate_texts_cached(texts, target_language, translate_client=None, cache=None,
+                           provider=TRANSLATION_PROVIDER, **batch_options):
+    """
+    Translates texts, deduplicating identical texts and consulting the translation cache first.
+
+    Args:
+        texts (list): The texts to translate.
+        target_language (str): The target language code.
+        translate_client: Optional translation client passed to translate_texts.
+        cache (TranslationCache): The cache to use, or None to skip caching.
+        provider (str): The provider name used in cache keys.
+        **batch_options: Batching options passed to translate_texts.
+
+    Returns:
+        list: The translated texts, in the same order as texts.
+    """
+    unique_texts = list(dict.fromkeys(texts))
+    translations = cache.get_many(unique_texts, target_language, provider) if cache else {}
+
+    missing = [text for text in unique_texts if text not in translations]
+    if missing:
+        new_translations = dict(zip(missing, translate_texts(missing, target_language, translate_client, **batch_options)))
+        if cache:
+            cache.put_many(new_translations, target_language, provider)
+        translations.update(new_translations)
+
+    record("cues_translated", len(texts))
+    return [translations[text] for text in texts]
+
+def translate_subtitle(srt_path, target_language, output_srt_path, translate_client=None,
+                       max_items=MAX_BATCH_ITEMS, max_chars=MAX_BATCH_CHARS,
+                       max_workers=MAX_CONCURRENT_BATCHES, use_cache=True, cache=None,
+                       progress_callback=None):
     """
     Translates an SRT subtitle file to a target language using Google Cloud Translate.
 
+    Cues are sent in batches bounded by max_items and max_chars, with up to
+    max_workers batches in flight at once. Identical cue texts are translated once,
+    and previously translated texts are read from the translation cache.
+
     Args:
         srt_path (str): The path to the input SRT file.
         target_language (str): The target language code (e.g., "zh-CN" for Simplified Chinese).
         output_srt_path (str): The path to save the translated SRT file.
+        translate_client: Optional translation client; defaults to a Google Cloud Translate v2 client.
+        max_items (int): Maximum number of cues per request.
+        max_chars (int): Maximum total characters per request.
+        max_workers (int): Maximum number of concurrent requests.
+        use_cache (bool): Whether to use the translation cache.
+        cache (TranslationCache): The cache to use; defaults to the shared on-disk cache.
+        progress_callback (callable): Optional function called with (translated_count, total) after each request.
 
     Returns:
         str: The path to the translated SRT file if successful, None otherwise.
     """
-    translate_client = translate.Client()
-
     try:
-        subs = pysrt.open(srt_path, encoding="utf-8")
-        translated_subs = pysrt.SubRipFile()
-
-        for sub in subs:
-            text = sub.text
-            result = translate_client.translate(text, target_language=target_language)
-            translated_text = result["translatedText"]
-            
-            new_sub = pysrt.SubRipItem(index=sub.index, start=sub.start, end=sub.end, text=translated_text)
-            translated_subs.append(new_sub)
-        
-        translated_subs.save(output_srt_path, encoding="utf-8")
+        subs = read_srt(srt_path)
+
+        if use_cache and cache is None:
+            cache = get_default_cache()
+        translated_texts = translate_texts_cached(
+            subs.texts(), target_language, translate_client,
+            cache if use_cache else None,
+            max_items=max_items, max_chars=max_chars, max_workers=max_workers,
+            progress_callback=progress_callback
+        )
+
+        translated_subs = CueList()
+        for i, translated_text in enumerate(translated_texts):
+            translated_subs.append(subs.starts[i], subs.ends[i], translated_text)
+
+        write_srt(translated_subs, output_srt_path)
+        if use_cache:
+            stats = cache.stats()
+            print(f"Translation cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
         print("Subtitle translation successful!")
         return output_srt_path
     except Exception as e:
@@ -57,4 +192,3 @@ This is a test.
     else:
         print("Subtitle translation failed.")
 
-
@@ -0,0 +1,181 @@
+import re
+from array import array
+
+_TIME_RE = re.compile(r"(\d+):(\d{2}):(\d{2})[,.](\d{1,3})")
+
+
+def parse_time(value):
+    """
+    Parses an SRT timestamp (HH:MM:SS,mmm) into integer milliseconds.
+    """
+    match = _TIME_RE.search(value)
+    if not match:
+        raise ValueError(f"Invalid SRT timestamp: {value!r}")
+    hours, minutes, seconds, millis = match.groups()
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis.ljust(3, "0"))
+
+
+def format_time(ms):
+    """
+    Formats integer milliseconds as an SRT timestamp (HH:MM:SS,mmm).
+    """
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{ms:03d}"
+
+
+def seconds_to_ms(seconds):
+    return int(round(seconds * 1000))
+
+
+class Cue:
+    """
+    A single subtitle cue with integer millisecond times.
+    """
+
+    __slots__ = ("start", "end", "text")
+
+    def __init__(self, start, end, text):
+        self.start = start
+        self.end = end
+        self.text = text
+
+    def __repr__(self):
+        return f"Cue({format_time(self.start)} --> {format_time(self.end)}, {self.text!r})"
+
+
+class CueList:
+    """
+    Compact, array-backed list of cues.
+
+    Start and end times are stored in integer arrays and all texts in one string
+    buffer with offsets, instead of one object per cue. Indexing returns a Cue.
+    """
+
+    def __init__(self, cues=()):
+        self.starts = array("q")
+        self.ends = array("q")
+        self.offsets = array("q", [0])
+        self._texts = []
+        self._buffer = None
+        for cue in cues:
+            self.append(cue.start, cue.end, cue.text)
+
+    def append(self, start, end, text):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.offsets.append(self.offsets[-1] + len(text))
+        self._texts.append(text)
+        self._buffer = None
+
+    @property
+    def buffer(self):
+        if self._buffer is None:
+            self._buffer = "".join(self._texts)
+            self._texts = [self._buffer]
+        return self._buffer
+
+    def text(self, i):
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]]
+
+    def texts(self):
+        buffer = self.buffer
+        offsets = self.offsets
+        return [buffer[offsets[i]:offsets[i + 1]] for i in range(len(self))]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("cue index out of range")
+        return Cue(self.starts[i], self.ends[i], self.text(i))
+
+    def __iter__(self):
+        buffer = self.buffer
+        offsets = self.offsets
+        for i in range(len(self)):
+            yield Cue(self.starts[i], self.ends[i], buffer[offsets[i]:offsets[i + 1]])
+
+
+def iter_cues(srt_path):
+    """
+    Lazily parses an SRT file, yielding Cue objects. Cue index lines are ignored.
+    """
+    with open(srt_path, "r", encoding="utf-8-sig") as f:
+        timing = None
+        lines = []
+        for line in f:
+            line = line.rstrip("\r\n")
+            if timing is None:
+                # Anything before the timing line is the cue index
+                if "-->" in line:
+                    start, end = line.split("-->", 1)
+                    timing = (parse_time(start), parse_time(end))
+            elif line.strip():
+                lines.append(line)
+            else:
+                yield Cue(timing[0], timing[1], "\n".join(lines))
+                timing = None
+                lines = []
+        if timing is not None:
+            yield Cue(timing[0], timing[1], "\n".join(lines))
+
+
+def read_srt(srt_path):
+    """
+    Reads an SRT file into a CueList.
+    """
+    return CueList(iter_cues(srt_path))
+
+
+def format_cue(index, start, end, text):
+    """
+    Formats one SRT cue. start and end are integer milliseconds.
+    """
+    return f"{index}\n{format_time(start)} --> {format_time(end)}\n{text}\n\n"
+
+
+class SrtWriter:
+    """
+    Writes SRT cues one at a time, numbering them from 1.
+
+    Usable as a context manager. Call flush() to make the cues written so far
+    visible to readers of the file.
+    """
+
+    def __init__(self, srt_path):
+        self._file = open(srt_path, "w", encoding="utf-8")
+        self.count = 0
+
+    def write(self, start, end, text):
+        self.count += 1
+        self._file.write(format_cue(self.count, start, end, text))
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_srt(cues, srt_path):
+    """
+    Writes cues (an iterable of Cue, e.g. a CueList) to an SRT file.
+
+    Returns:
+        int: The number of cues written.
+    """
+    with SrtWriter(srt_path) as writer:
+        for cue in cues:
+            writer.write(cue.start, cue.end, cue.text)
+        return writer.count
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from subtitles import seconds_to_ms
+
+DEFAULT_CACHE_PATH = os.environ.get("TRANSCRIPTION_CACHE_PATH", "./cache/transcriptions.sqlite3")
+DEFAULT_MAX_MB = int(os.environ.get("TRANSCRIPTION_CACHE_MAX_MB", "512"))
+
+# Bytes of PCM hashed per read when fingerprinting audio
+_FINGERPRINT_BLOCK = 1024 * 1024
+# Range of the packed segment times
+_MIN_MS = -2 ** 31
+_MAX_MS = 2 ** 31 - 1
+
+
+def audio_fingerprint(audio):
+    """
+    Returns the SHA-256 hex digest of audio as 16 kHz mono signed 16-bit little-endian PCM.
+
+    The digest is the same whether the audio is given as a .pcm file from
+    extract_audio_pcm, as float32 samples, or as a media file (decoded over an ffmpeg
+    pipe), so re-uploads and mirrors of a video map to the same cache entry.
+
+    Args:
+        audio (str or numpy.ndarray): A .pcm file, a media file or 16 kHz mono float32 samples.
+    """
+    import numpy as np
+
+    digest = hashlib.sha256()
+    if isinstance(audio, str) and audio.endswith(".pcm"):
+        with open(audio, "rb") as f:
+            for block in iter(lambda: f.read(_FINGERPRINT_BLOCK), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    if isinstance(audio, str):
+        from audio_extractor import iter_audio_blocks
+        blocks = iter_audio_blocks(audio, _FINGERPRINT_BLOCK // 2)
+    else:
+        blocks = (audio[start:start + _FINGERPRINT_BLOCK // 2] for start in range(0, len(audio), _FINGERPRINT_BLOCK // 2))
+    for block in blocks:
+        # Samples decoded from 16-bit PCM convert back exactly
+        digest.update(np.clip(np.round(block * 32768.0), -32768, 32767).astype("<i2").tobytes())
+    return digest.hexdigest()
+
+
+def pack_segments(segments):
+    """
+    Serializes segments compactly: start and end times as signed 32-bit milliseconds
+    (clamped to that range), the texts as NUL-separated UTF-8, all zlib-compressed.
+    """
+    times = []
+    for segment in segments:
+        times.append(min(max(seconds_to_ms(segment["start"]), _MIN_MS), _MAX_MS))
+        times.append(min(max(seconds_to_ms(segment["end"]), _MIN_MS), _MAX_MS))
+    texts = "\0".join(segment["text"].replace("\0", "") for segment in segments).encode("utf-8")
+    return zlib.compress(struct.pack(f"<I{len(times)}i", len(segments), *times) + texts)
+
+
+def unpack_segments(blob):
+    """
+    Returns the segment dicts ("start", "end" in seconds and "text") stored by pack_segments.
+    """
+    data = zlib.decompress(blob)
+    count = struct.unpack_from("<I", data)[0]
+    times = struct.unpack_from(f"<{2 * count}i", data, 4)
+    texts = data[4 + 8 * count:].decode("utf-8").split("\0") if count else []
+    return [
+        {"start": times[2 * i] / 1000, "end": times[2 * i + 1] / 1000, "text": text}
+        for i, text in enumerate(texts)
+    ]
+
+
+class TranscriptionCache:
+    """
+    On-disk cache of transcription results keyed by an audio fingerprint and the
+    transcription settings (engine, model, compute type and options).
+
+    Segments are stored packed (see pack_segments). Entries are evicted in
+    least-recently-used order once their total size exceeds max_mb.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_mb=DEFAULT_MAX_MB):
+        self.path = path
+        self.max_bytes = max_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS transcriptions ("
+            " key TEXT PRIMARY KEY,"
+            " segments BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS transcriptions_last_used ON transcriptions (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(fingerprint, engine, model_name, compute_type, options=None):
+        payload = json.dumps({
+            "audio": fingerprint,
+            "engine": engine,
+            "model": model_name,
+            "compute_type": compute_type,
+            "options": options or {},
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached segments for key, or None.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT segments FROM transcriptions WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._conn.execute("UPDATE transcriptions SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+                self.hits += 1
+            else:
+                self.misses += 1
+        return unpack_segments(row[0]) if row else None
+
+    def put(self, key, segments):
+        """
+        Stores segments, a list of dicts with "start", "end" (seconds) and "text".
+        """
+        blob = pack_segments(segments)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transcriptions (key, segments, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        excess = self._total_bytes() - self.max_bytes
+        if excess <= 0:
+            return
+        evicted = []
+        for key, size in self._conn.execute("SELECT key, size FROM transcriptions ORDER BY last_used ASC"):
+            if excess <= 0:
+                break
+            evicted.append((key,))
+            excess -= size
+        self._conn.executemany("DELETE FROM transcriptions WHERE key = ?", evicted)
+
+    def _total_bytes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM transcriptions").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM transcriptions").fetchone()[0]
+            total_bytes = self._total_bytes()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+            "bytes": total_bytes,
+        }
+
+    def close(self):
+        self._conn.close()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """
+    Returns the process-wide transcription cache stored at DEFAULT_CACHE_PATH.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = TranscriptionCache()
+        return _default_cache
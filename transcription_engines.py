@@ -0,0 +1,196 @@
+import importlib.util
+import os
+import shutil
+from model_registry import registry
+
+DEFAULT_ENGINE = os.environ.get("TRANSCRIBE_ENGINE", "whisper")
+# CTranslate2 threads per faster-whisper model, 0 uses OMP_NUM_THREADS or 4
+FASTER_WHISPER_CPU_THREADS = int(os.environ.get("FASTER_WHISPER_CPU_THREADS", "0"))
+# Greedy decoding, like openai-whisper's transcribe() at temperature 0
+FASTER_WHISPER_BEAM_SIZE = 1
+
+
+class TranscriptionEngine:
+    """
+    A speech-to-text backend for subtitle_generator.
+
+    Engines load their models through the process-local model registry and hand them
+    out as leases. A leased model has a transcribe(audio, initial_prompt=None) method
+    taking 16 kHz mono float32 samples and returning a Whisper-style result: a dict with
+    the full "text" and a list of "segments", each with "start", "end" (seconds) and "text".
+    """
+
+    name = None
+    # Python module that must be importable for the engine to work
+    module = None
+    compute_types = ()
+    default_compute_type = None
+
+    def is_available(self):
+        return importlib.util.find_spec(self.module) is not None
+
+    def model(self, model_name="base", device=None, compute_type=None):
+        """
+        Leases a loaded model.
+
+        Args:
+            model_name (str): The model name (e.g., "base", "small") or a local model path.
+            device (str): The device to run the model on. Engine specific default.
+            compute_type (str): The numeric precision, one of compute_types. Engine specific default.
+
+        Returns:
+            A context manager yielding the model.
+        """
+        raise NotImplementedError
+
+    def resolve_device(self, device=None):
+        """
+        Returns the device a model runs on when loaded with device (None for the engine default).
+        """
+        return device
+
+    def key_device(self, device=None):
+        """
+        Returns the device to record in transcription cache keys, without importing the
+        engine's backend: device if given, otherwise "cuda" if an NVIDIA driver is
+        installed and "cpu" if not. Without a driver the default device is always the CPU;
+        with one, a CPU-only backend still runs on the CPU, which at worst lets a CUDA
+        run reuse full-precision CPU results.
+        """
+        if device not in (None, "auto"):
+            return device
+        return "cuda" if _nvidia_driver_installed() else "cpu"
+
+    def check_compute_type(self, compute_type):
+        """
+        Returns compute_type, or the default if it is None.
+
+        Raises:
+            ValueError: If the engine does not support compute_type.
+        """
+        compute_type = compute_type or self.default_compute_type
+        if compute_type not in self.compute_types:
+            raise ValueError(f"Compute type {compute_type} is not supported by the {self.name} engine "
+                             f"(supported: {', '.join(self.compute_types)})")
+        return compute_type
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "available": self.is_available(),
+            "compute_types": list(self.compute_types),
+            "default_compute_type": self.default_compute_type,
+        }
+
+
+def _nvidia_driver_installed():
+    return os.path.exists("/proc/driver/nvidia/version") or shutil.which("nvidia-smi") is not None
+
+
+class WhisperEngine(TranscriptionEngine):
+    """
+    OpenAI Whisper on PyTorch: fp32 on CPU, fp16 on CUDA.
+    """
+
+    name = "whisper"
+    module = "whisper"
+    compute_types = ("default",)
+    default_compute_type = "default"
+
+    def resolve_device(self, device=None):
+        if device is None:
+            import torch
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        return device
+
+    def model(self, model_name="base", device=None, compute_type=None):
+        self.check_compute_type(compute_type)
+        device = self.resolve_device(device)
+
+        def load():
+            import whisper
+            return whisper.load_model(model_name, device=device)
+
+        return registry.lease(("whisper", model_name, device), load, _torch_model_size_bytes)
+
+
+def _torch_model_size_bytes(model):
+    return sum(p.numel() * p.element_size() for p in model.parameters())
+
+
+class FasterWhisperModel:
+    """
+    Adapts a faster_whisper.WhisperModel to the Whisper-style transcribe() of TranscriptionEngine.
+    """
+
+    def __init__(self, model, size_bytes=0):
+        self.model = model
+        self.size_bytes = size_bytes
+
+    def transcribe(self, audio, initial_prompt=None, **options):
+        options.setdefault("beam_size", FASTER_WHISPER_BEAM_SIZE)
+        segments, info = self.model.transcribe(audio, initial_prompt=initial_prompt, **options)
+        # faster-whisper decodes lazily as the segments are iterated
+        segments = [{"start": segment.start, "end": segment.end, "text": segment.text} for segment in segments]
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": info.language,
+        }
+
+
+class FasterWhisperEngine(TranscriptionEngine):
+    """
+    faster-whisper: Whisper models converted to CTranslate2, int8 quantized by default,
+    which is several times faster than PyTorch fp32 on CPU and uses less memory.
+    """
+
+    name = "faster-whisper"
+    module = "faster_whisper"
+    compute_types = ("int8", "int8_float32", "int8_float16", "float16", "float32", "default")
+    default_compute_type = "int8"
+
+    def resolve_device(self, device=None):
+        if device in (None, "auto"):
+            import ctranslate2
+            device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+        return device
+
+    def model(self, model_name="base", device=None, compute_type=None):
+        compute_type = self.check_compute_type(compute_type)
+        device = self.resolve_device(device)
+
+        def load():
+            from faster_whisper import WhisperModel
+            from faster_whisper.utils import download_model
+            model_path = model_name if os.path.isdir(model_name) else download_model(model_name)
+            model = WhisperModel(model_path, device=device, compute_type=compute_type,
+                                 cpu_threads=FASTER_WHISPER_CPU_THREADS)
+            # Stored weights (float16 on the hub); an upper bound for int8
+            return FasterWhisperModel(model, os.path.getsize(os.path.join(model_path, "model.bin")))
+
+        return registry.lease(("faster-whisper", model_name, device, compute_type), load,
+                              lambda model: model.size_bytes)
+
+
+ENGINES = {engine.name: engine for engine in (WhisperEngine(), FasterWhisperEngine())}
+
+
+def get_engine(name=None):
+    """
+    Returns the transcription engine registered under name, or the default engine.
+
+    Raises:
+        ValueError: If there is no such engine.
+    """
+    name = name or DEFAULT_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Unknown transcription engine: {name} (available: {', '.join(ENGINES)})")
+    return ENGINES[name]
+
+
+def transcription_model(engine=None, model_name="base", device=None, compute_type=None):
+    """
+    Leases a loaded model of a transcription engine, see TranscriptionEngine.model.
+    """
+    return get_engine(engine).model(model_name, device, compute_type)
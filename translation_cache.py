@@ -0,0 +1,125 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.environ.get("TRANSLATION_CACHE_PATH", "./cache/translations.sqlite3")
+DEFAULT_MAX_ENTRIES = int(os.environ.get("TRANSLATION_CACHE_MAX_ENTRIES", "200000"))
+
+
+class TranslationCache:
+    """
+    On-disk translation memo cache keyed by (source text, target language, provider).
+
+    Entries are evicted in least-recently-used order once the cache holds more
+    than max_entries rows.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " key TEXT PRIMARY KEY,"
+            " translated_text TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text, target_language, provider):
+        return hashlib.sha256(f"{provider}\0{target_language}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts, target_language, provider):
+        """
+        Looks up translations for texts.
+
+        Returns:
+            dict: Mapping from source text to cached translation, for the texts that were found.
+        """
+        keys = {self.make_key(text, target_language, provider): text for text in set(texts)}
+        found = {}
+        with self._lock:
+            key_list = list(keys)
+            # Stay below SQLite's bound parameter limit
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, translated_text FROM translations WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, translated_text in rows:
+                    found[keys[key]] = translated_text
+                if rows:
+                    now = time.time()
+                    self._conn.executemany(
+                        "UPDATE translations SET last_used = ? WHERE key = ?", [(now, key) for key, _ in rows]
+                    )
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, translations, target_language, provider):
+        """
+        Stores translations, a mapping from source text to translated text.
+        """
+        now = time.time()
+        rows = [
+            (self.make_key(text, target_language, provider), translated_text, now)
+            for text, translated_text in translations.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (key, translated_text, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM translations WHERE key IN"
+                " (SELECT key FROM translations ORDER BY last_used ASC LIMIT ?)", (excess,)
+            )
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+        }
+
+    def close(self):
+        self._conn.close()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """
+    Returns the process-wide translation cache stored at DEFAULT_CACHE_PATH.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = TranslationCache()
+        return _default_cache
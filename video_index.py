@@ -0,0 +1,124 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Inside the agent's default work directory
+DEFAULT_INDEX_PATH = "./work/video_index.sqlite3"
+
+
+class VideoIndex:
+    """
+    Persistent index of processed videos keyed by canonical YouTube video ID.
+
+    Records which stages of a video have completed and the Bilibili submission it
+    was uploaded as, so reposted videos can be skipped before anything is downloaded.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            " video_id TEXT PRIMARY KEY,"
+            " youtube_url TEXT NOT NULL,"
+            " stages TEXT NOT NULL,"
+            " submission TEXT,"
+            " uploaded_at REAL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _to_dict(row):
+        return {
+            "video_id": row["video_id"],
+            "youtube_url": row["youtube_url"],
+            "stages": json.loads(row["stages"]),
+            "submission": json.loads(row["submission"]) if row["submission"] else None,
+            "uploaded_at": row["uploaded_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    def get(self, video_id):
+        """
+        Returns the entry of a video, or None if it has not been processed.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def get_uploaded(self, video_id):
+        """
+        Returns the entry of a video if it has been uploaded to Bilibili, None otherwise.
+        """
+        entry = self.get(video_id)
+        return entry if entry and entry["uploaded_at"] else None
+
+    def record_stage(self, video_id, youtube_url, stage):
+        """
+        Records that a stage of a video has completed.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT stages FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+            stages = json.loads(row["stages"]) if row else {}
+            stages[stage] = now
+            self._conn.execute(
+                "INSERT INTO videos (video_id, youtube_url, stages, updated_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (video_id) DO UPDATE SET youtube_url = excluded.youtube_url,"
+                " stages = excluded.stages, updated_at = excluded.updated_at",
+                (video_id, youtube_url, json.dumps(stages), now)
+            )
+            self._conn.commit()
+
+    def record_submission(self, video_id, youtube_url, submission):
+        """
+        Records the Bilibili submission a video was uploaded as.
+        """
+        self.record_stage(video_id, youtube_url, "upload")
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE videos SET submission = ?, uploaded_at = ?, updated_at = ? WHERE video_id = ?",
+                (json.dumps(submission), now, now, video_id)
+            )
+            self._conn.commit()
+
+    def list(self, uploaded_only=False):
+        """
+        Returns all entries, most recently updated first.
+        """
+        query = "SELECT * FROM videos"
+        if uploaded_only:
+            query += " WHERE uploaded_at IS NOT NULL"
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY updated_at DESC").fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def purge(self, video_ids=None):
+        """
+        Removes the given videos from the index, or all videos if video_ids is None.
+
+        Returns:
+            int: The number of removed entries.
+        """
+        with self._lock:
+            if video_ids is None:
+                removed = self._conn.execute("DELETE FROM videos").rowcount
+            else:
+                removed = self._conn.executemany(
+                    "DELETE FROM videos WHERE video_id = ?", [(video_id,) for video_id in video_ids]
+                ).rowcount
+            self._conn.commit()
+        return removed
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+
+# Default disk budget for job work directories, in gigabytes. Can be overridden
+# with the WORK_DISK_BUDGET_GB environment variable.
+DEFAULT_DISK_BUDGET_GB = float(os.environ.get("WORK_DISK_BUDGET_GB", "50"))
+
+# Large intermediates that can be re-created by re-running their stage.
+# Subtitle files and other small artifacts are always kept.
+EVICTABLE_EXTENSIONS = {".mp4", ".mkv", ".webm", ".m4a", ".mp3", ".opus", ".pcm", ".wav", ".part", ".ytdl"}
+
+# Marker file written into a job directory once the job has finished.
+# Its modification time is the job's last use, for LRU ordering.
+FINISHED_MARKER = ".finished"
+
+_enforce_lock = threading.Lock()
+
+
+def mark_finished(job_dir):
+    """
+    Marks a job directory as finished, making its large intermediates evictable.
+    """
+    with open(os.path.join(job_dir, FINISHED_MARKER), "w", encoding="utf-8") as f:
+        f.write(str(time.time()))
+
+
+def touch(path):
+    """
+    Records a use of a file that belongs to a finished job, moving that job to the back of the LRU order.
+    """
+    marker = os.path.join(os.path.dirname(os.path.abspath(path)), FINISHED_MARKER)
+    if os.path.exists(marker):
+        os.utime(marker)
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def enforce_disk_budget(jobs_dir, budget_bytes=DEFAULT_DISK_BUDGET_GB * 1024 ** 3):
+    """
+    Evicts large intermediates of finished jobs, least recently used first, until
+    the job directories fit in budget_bytes. Jobs that are still running are never touched.
+
+    Args:
+        jobs_dir (str): The directory containing one subdirectory per job.
+        budget_bytes (float): The disk budget in bytes.
+
+    Returns:
+        int: The number of bytes freed.
+    """
+    if not os.path.isdir(jobs_dir):
+        return 0
+
+    with _enforce_lock:
+        total = _dir_size(jobs_dir)
+        if total <= budget_bytes:
+            return 0
+
+        finished = []
+        for name in os.listdir(jobs_dir):
+            marker = os.path.join(jobs_dir, name, FINISHED_MARKER)
+            if os.path.exists(marker):
+                finished.append((os.path.getmtime(marker), os.path.join(jobs_dir, name)))
+        finished.sort()
+
+        freed = 0
+        for _, job_dir in finished:
+            if total - freed <= budget_bytes:
+                break
+            for name in os.listdir(job_dir):
+                path = os.path.join(job_dir, name)
+                if os.path.isfile(path) and os.path.splitext(name)[1].lower() in EVICTABLE_EXTENSIONS:
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                    freed += size
+                    print(f"Evicted {path} ({size / 1024 / 1024:.0f} MB)")
+
+        if total - freed > budget_bytes:
+            print(f"Work directory still over budget: {(total - freed) / 1024 ** 3:.1f} GB used")
+        return freed
@@ -1,45 +1,219 @@
-import subprocess
 import os
+import re
+import subprocess
+import time
+from urllib.parse import urlparse, parse_qs
+from metrics import span, record
+
+VIDEO_FORMAT = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"
+# Separate streams for audio-first downloads
+AUDIO_STREAM_FORMAT = "bestaudio[ext=m4a]/bestaudio"
+VIDEO_STREAM_FORMAT = "bestvideo[ext=mp4]/bestvideo"
+DEFAULT_CONCURRENT_FRAGMENTS = int(os.environ.get("DOWNLOAD_CONCURRENT_FRAGMENTS", "4"))
+# Bytes per second, unset for no limit
+DEFAULT_RATE_LIMIT = int(os.environ["DOWNLOAD_RATE_LIMIT"]) if os.environ.get("DOWNLOAD_RATE_LIMIT") else None
+
+_VIDEO_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+def extract_video_id(url):
+    """
+    Extracts the 11-character YouTube video ID from a URL.
+
+    Handles watch URLs, youtu.be short links, /shorts/, /embed/, /live/ and /v/ paths,
+    as well as bare video IDs.
+
+    Args:
+        url (str): The YouTube URL or video ID.
+
+    Returns:
+        str: The video ID, or None if it cannot be determined.
+    """
+    url = url.strip()
+    if _VIDEO_ID_RE.match(url):
+        return url
+    if "://" not in url:
+        url = "https://" + url
+
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    path_parts = [part for part in parsed.path.split("/") if part]
+
+    candidate = None
+    if host == "youtu.be" or host.endswith(".youtu.be"):
+        candidate = path_parts[0] if path_parts else None
+    elif host == "youtube.com" or host.endswith(".youtube.com") or host == "youtube-nocookie.com" or host.endswith(".youtube-nocookie.com"):
+        query = parse_qs(parsed.query)
+        if "v" in query:
+            candidate = query["v"][0]
+        elif len(path_parts) >= 2 and path_parts[0] in ("shorts", "embed", "live", "v", "e"):
+            candidate = path_parts[1]
+
+    if candidate and _VIDEO_ID_RE.match(candidate):
+        return candidate
+    return None
 
-def download_youtube_video(url, output_path="."):
+class _ProgressTracker:
     """
-    Downloads a YouTube video using yt-dlp.
+    Aggregates yt-dlp progress hook calls across the files of one download (e.g. video and audio streams).
+    """
+
+    # Minimum interval between progress callbacks, in seconds
+    REPORT_INTERVAL = 0.5
+
+    def __init__(self, progress_callback):
+        self.progress_callback = progress_callback
+        self.files = {}  # filename -> (downloaded_bytes, total_bytes)
+        self.last_report = 0
+
+    def __call__(self, status):
+        if status["status"] not in ("downloading", "finished"):
+            return
+        downloaded = status.get("downloaded_bytes") or 0
+        total = status.get("total_bytes") or status.get("total_bytes_estimate") or downloaded
+        self.files[status.get("filename")] = (downloaded, total)
+
+        now = time.monotonic()
+        if status["status"] == "downloading" and now - self.last_report < self.REPORT_INTERVAL:
+            return
+        self.last_report = now
+        if self.progress_callback:
+            downloaded_bytes = sum(d for d, _ in self.files.values())
+            total_bytes = sum(t for _, t in self.files.values())
+            self.progress_callback(downloaded_bytes, total_bytes)
+
+def download_youtube_video(url, output_path=".", progress_callback=None, concurrent_fragments=DEFAULT_CONCURRENT_FRAGMENTS,
+                           rate_limit=DEFAULT_RATE_LIMIT, video_format=VIDEO_FORMAT, filename="%(title)s.%(ext)s"):
+    """
+    Downloads a YouTube video in-process using the yt-dlp Python API.
 
     Args:
         url (str): The URL of the YouTube video.
         output_path (str): The directory to save the downloaded video.
+        progress_callback (callable): Optional function called with (downloaded_bytes, total_bytes).
+        concurrent_fragments (int): Number of fragments of a DASH/HLS format downloaded in parallel.
+        rate_limit (int): Maximum download rate in bytes per second, or None for no limit.
+        video_format (str): yt-dlp format selector.
+        filename (str): yt-dlp output filename template.
 
     Returns:
         str: The path to the downloaded video file if successful, None otherwise.
     """
+    import yt_dlp  # Takes ~0.3s, so only imported on first download
+
     os.makedirs(output_path, exist_ok=True)
+    tracker = _ProgressTracker(progress_callback)
+    options = {
+        "format": video_format,
+        "merge_output_format": "mp4",
+        "outtmpl": os.path.join(output_path, filename),
+        "concurrent_fragment_downloads": concurrent_fragments,
+        "ratelimit": rate_limit,
+        "progress_hooks": [tracker],
+        "noplaylist": True,
+        "quiet": True,
+        "noprogress": True,
+    }
     try:
-        command = [
-            "yt-dlp",
-            "-f", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
-            "--merge-output-format", "mp4",
-            "-o", os.path.join(output_path, "%(title)s.%(ext)s"),
-            url
-        ]
-        print(f"Executing command: {' '.join(command)}")
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        with span("yt_dlp.download", format=video_format), yt_dlp.YoutubeDL(options) as ydl:
+            info = ydl.extract_info(url, download=True)
+            # requested_downloads holds the final path, after merging
+            downloads = info.get("requested_downloads") or []
+            video_path = downloads[0].get("filepath") if downloads else None
+            if not video_path:
+                video_path = ydl.prepare_filename(info)
+        record("bytes_downloaded", sum(downloaded for downloaded, _ in tracker.files.values()))
         print("Download successful!")
-        print("STDOUT:", result.stdout)
-        print("STDERR:", result.stderr)
+        return video_path
+    except yt_dlp.utils.DownloadError as e:
+        print(f"Error downloading video: {e}")
+        return None
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+        return None
 
-        # Extract the downloaded filename from stdout
-        for line in result.stdout.splitlines():
-            if "[Merger] Merging formats into" in line:
-                # The filename is usually enclosed in double quotes after 'Merging formats into'
-                return line.split("Merging formats into \"")[1].split("\"")[0]
-            elif "[download] Destination:" in line:
-                return line.split("Destination:")[1].strip()
+def download_audio_stream(url, output_path=".", progress_callback=None, **kwargs):
+    """
+    Downloads only the audio stream of a YouTube video, which is much smaller than the video stream.
 
-        return None
+    Returns:
+        str: The path to the downloaded audio file if successful, None otherwise.
+    """
+    return download_youtube_video(url, output_path, progress_callback, video_format=AUDIO_STREAM_FORMAT,
+                                  filename="%(title)s.audio.%(ext)s", **kwargs)
+
+def download_video_stream(url, output_path=".", progress_callback=None, **kwargs):
+    """
+    Downloads only the video stream of a YouTube video, without audio.
+
+    Returns:
+        str: The path to the downloaded video file if successful, None otherwise.
+    """
+    return download_youtube_video(url, output_path, progress_callback, video_format=VIDEO_STREAM_FORMAT,
+                                  filename="%(title)s.video.%(ext)s", **kwargs)
+
+def expand_urls(url):
+    """
+    Expands a playlist or channel URL into its videos using yt-dlp metadata, without downloading.
+
+    A single video URL expands to itself. Channel tabs (Videos, Shorts, ...) are expanded too.
+
+    Args:
+        url (str): A video, playlist or channel URL.
+
+    Returns:
+        list: Dicts with the "url" and "title" (None if unknown) of each video.
+    """
+    import yt_dlp
+
+    options = {
+        "extract_flat": "in_playlist",
+        "skip_download": True,
+        "quiet": True,
+        "noprogress": True,
+    }
+    with yt_dlp.YoutubeDL(options) as ydl:
+        return _flatten_entries(ydl, ydl.extract_info(url, download=False))
+
+def _flatten_entries(ydl, info):
+    if info.get("_type") != "playlist":
+        return [{"url": info.get("webpage_url") or info.get("url"), "title": info.get("title")}]
+    videos = []
+    for entry in info.get("entries") or []:
+        if not entry:
+            continue
+        if entry.get("_type") == "playlist" or entry.get("ie_key") == "YoutubeTab":
+            # Nested playlists such as channel tabs are only listed, not expanded, by extract_flat
+            videos.extend(_flatten_entries(ydl, ydl.extract_info(entry["url"], download=False)))
+        else:
+            videos.append({"url": entry.get("url") or entry.get("webpage_url"), "title": entry.get("title")})
+    return videos
+
+def merge_streams(video_path, audio_path, output_path):
+    """
+    Merges separately downloaded video and audio streams into one MP4 file without re-encoding.
 
+    Returns:
+        str: The path to the merged file if successful, None otherwise.
+    """
+    try:
+        command = [
+            "ffmpeg",
+            "-nostdin",
+            "-i", video_path,
+            "-i", audio_path,
+            "-map", "0:v:0",
+            "-map", "1:a:0",
+            "-c", "copy",
+            "-movflags", "+faststart",
+            "-y",
+            output_path
+        ]
+        print(f"Executing command: {' '.join(command)}")
+        subprocess.run(command, capture_output=True, text=True, check=True)
+        print("Stream merge successful!")
+        return output_path
     except subprocess.CalledProcessError as e:
-        print(f"Error downloading video: {e}")
-        print("STDOUT:", e.stdout)
+        print(f"Error merging streams: {e}")
         print("STDERR:", e.stderr)
         return None
     except Exception as e: